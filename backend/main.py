@@ -1,22 +1,28 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
+import mimetypes
 import os
+import queue
 import re
 import shutil
+import struct
 import subprocess
 import sys
 import tempfile
 import threading
+import time
 import uuid
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from urllib.parse import urlparse
-from urllib.request import urlopen
-from typing import List, Optional
+from urllib.parse import urlparse, urlsplit
+from typing import Callable, List, Optional
 
 from fastapi import (
-    BackgroundTasks,
     FastAPI,
     File,
     Form,
@@ -27,11 +33,20 @@ from fastapi import (
     WebSocketDisconnect,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
 from pydantic import BaseModel, Field
 from .update_manager import UpdateManager
 
+try:
+    import orjson  # type: ignore
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:  # orjson é opcional; sem ele usa o json da stdlib
+    orjson = None
+    DefaultResponse = JSONResponse
+
 
 # ======================================================================================
 # Utilidades de caminho / binários (funciona em dev e empacotado)
@@ -67,21 +82,65 @@ def safe_bin(name: str) -> Path:
         return packaged_path
     if fallback_path.exists():
         return fallback_path
+    # Ao lado do próprio backend (layout do launcher), que exporta FFMPEG_EXE etc.
+    exported = os.environ.get(name.upper().replace(".", "_"))
+    if exported and Path(exported).is_file():
+        return Path(exported)
+    local_path = base_dir / name
+    if local_path.exists():
+        return local_path
     print(f"[WARN] Executável não encontrado: {name}")
     return Path(name)
 
 
+def user_cache_dir() -> Path:
+    """
+    Pasta de cache por usuário (%APPDATA%/UltraDownloader no Windows).
+    Não é criada aqui; quem grava deve garantir a existência.
+    """
+    if sys.platform == "win32":
+        base = Path(os.environ.get("APPDATA") or (Path.home() / "AppData" / "Roaming"))
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or (Path.home() / ".cache"))
+    return base / "UltraDownloader"
+
+
+# Spawns auxiliares (ffmpeg/ffprobe/yt-dlp/powershell) sem janela de console no Windows.
+WIN_HIDDEN_STARTUPINFO = None
+WIN_CREATE_NO_WINDOW = 0
+if sys.platform == "win32":
+    WIN_HIDDEN_STARTUPINFO = subprocess.STARTUPINFO()
+    WIN_HIDDEN_STARTUPINFO.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    WIN_CREATE_NO_WINDOW = subprocess.CREATE_NO_WINDOW
+
+
 FFMPEG_EXE  = safe_bin("ffmpeg.exe")
 FFPROBE_EXE = safe_bin("ffprobe.exe")
 YTDLP_EXE   = safe_bin("yt-dlp.exe")
+# Versões em texto, montadas uma vez (usadas em cada chamada de _build_yt_args)
+FFMPEG_DIR_STR = os.fspath(FFMPEG_EXE.parent)
 
 AUDIO_FORMATS = {"mp3", "m4a", "wav", "flac"}
 DISCORD_TARGET_BYTES = 9 * 1024 * 1024
-INSTAGRAM_HOST_RE = re.compile(r"(?:https?://)?(?:www\.|m\.)?instagram\.com/", re.IGNORECASE)
-FACEBOOK_HOST_RE = re.compile(r"(?:https?://)?(?:www\.|m\.)?(facebook\.com|fb\.watch)/", re.IGNORECASE)
-TWITTER_HOST_RE = re.compile(r"(?:https?://)?(?:www\.)?(twitter\.com|x\.com)/", re.IGNORECASE)
-VIDEO_EXTS = {"mp4", "mkv", "mov", "webm", "avi"}
-IMAGE_EXTS = {"jpg", "jpeg", "png", "webp", "gif"}
+# Plataformas com download "simples", por domínio (vale também para subdomínios:
+# www., m., mbasic., business., l. ...).
+URL_HOST_KIND = {
+    "instagram.com": "instagram",
+    "facebook.com": "facebook",
+    "fb.watch": "facebook",
+    "twitter.com": "twitter",
+    "x.com": "twitter",
+}
+# Fallback para textos que não parseiam como URL: uma única alternância, plataforma via lastgroup.
+HOST_RE = re.compile(
+    r"(?:https?://)?(?:www\.|m\.)?"
+    r"(?:(?P<instagram>instagram\.com)|(?P<facebook>facebook\.com|fb\.watch)|(?P<twitter>twitter\.com|x\.com))/",
+    re.IGNORECASE,
+)
+VIDEO_EXTS = frozenset({"mp4", "mkv", "mov", "webm", "avi"})
+IMAGE_EXTS = frozenset({"jpg", "jpeg", "png", "webp", "gif"})
 
 # Ordem preferida de encoders acelerados por hardware (GPU) suportados.
 HW_ENCODER_ORDER = [
@@ -90,6 +149,12 @@ HW_ENCODER_ORDER = [
     ("amd", "h264_amf"),
     ("apple", "h264_videotoolbox"),
 ]
+# Reconhece o fabricante a partir do nome da placa (Windows) ou do vendor ID PCI (Linux).
+GPU_VENDOR_PATTERNS = {
+    "nvidia": re.compile(r"\b(?:nvidia|geforce|quadro|rtx|tesla|0x10de)\b", re.IGNORECASE),
+    "intel": re.compile(r"\b(?:intel|iris|arc|uhd|0x8086)\b", re.IGNORECASE),
+    "amd": re.compile(r"\b(?:amd|radeon|ati|0x1002)\b", re.IGNORECASE),
+}
 # Ajustes extras aplicados a cada encoder, quando necessǭrio.
 HW_ENCODER_EXTRA_ARGS: dict[str, list[str]] = {
     "h264_nvenc": ["-preset", "p5"],
@@ -97,20 +162,163 @@ HW_ENCODER_EXTRA_ARGS: dict[str, list[str]] = {
     "h264_amf": ["-quality", "balanced"],
     "h264_videotoolbox": [],
 }
+# Modo Discord (meta de tamanho, prioridade em velocidade): substitui os ajustes
+# padrão do encoder por presets rápidos e controle de taxa constante.
+LOW_LATENCY_ENCODER_ARGS: dict[str, list[str]] = {
+    # x264 no Discord roda em dois passos: sem '-tune zerolatency', que desliga mbtree,
+    # lookahead e B-frames (justamente o que o segundo passo aproveita)
+    "libx264": ["-preset", "veryfast"],
+    "h264_nvenc": ["-preset", "p4", "-tune", "ll", "-rc", "cbr", "-zerolatency", "1"],
+    "h264_amf": ["-usage", "transcoding", "-quality", "speed", "-rc", "cbr"],
+    "h264_qsv": ["-preset", "veryfast"],
+    "h264_videotoolbox": ["-realtime", "1"],
+}
+LOW_LATENCY_DEFAULT_FPS = 24
+
+# Decode por hardware combinando com cada encoder: (argumentos antes do -i, filtro de
+# escala na GPU). Com filtro, os quadros ficam na GPU do decode ao encode; sem filtro
+# (None) voltam para a memória do sistema e usam o scale/pix_fmt da CPU.
+HW_DECODE_ARGS: dict[str, tuple[list[str], Optional[str]]] = {
+    "h264_nvenc": (["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"], "scale_cuda=-2:{h}"),
+    "h264_qsv": (["-hwaccel", "qsv", "-hwaccel_output_format", "qsv"], "scale_qsv=w=-1:h={h}"),
+    "h264_amf": (["-hwaccel", "d3d11va"], None),
+    "h264_videotoolbox": (["-hwaccel", "videotoolbox"], None),
+}
 
 _HW_ENCODER_DETECTED: list[str] | None = None
 _HW_ENCODER_LOCK = threading.Lock()
+HW_ENCODER_CACHE_FILE = user_cache_dir() / "hw_encoders.json"
+# No primeiro uso após o boot o driver (NVENC/AMF) pode levar alguns segundos para subir
+HW_ENCODER_PROBE_TIMEOUT = 10
+FFMPEG_ENCODERS_CACHE_FILE = user_cache_dir() / "ffmpeg_encoders.txt"
+
+# Tamanho do bloco usado ao baixar binários de update (yt-dlp.exe / app).
+DOWNLOAD_CHUNK_SIZE = 1 << 20
 
 
 # ======================================================================================
 # App & CORS
 # ======================================================================================
 
-app = FastAPI(title="Ultra Downloader Backend", version="1.0")
+app = FastAPI(
+    title="Ultra Downloader Backend",
+    version="1.0",
+    default_response_class=DefaultResponse,
+)
 
 # Endpoint de check removido para silenciar updates
 
 
+def _stream_download(url: str, dest: Path, timeout: float = 60) -> None:
+    """
+    Baixa 'url' para 'dest' em blocos grandes, reutilizando um único buffer
+    pré-alocado (readinto) em vez do buffer de 16 KB do shutil.copyfileobj.
+    """
+    from urllib.request import urlopen  # só o fluxo de update usa urllib.request
+
+    buf = bytearray(DOWNLOAD_CHUNK_SIZE)
+    view = memoryview(buf)
+    with urlopen(url, timeout=timeout) as response, open(dest, "wb", buffering=0) as out_file:
+        while True:
+            n = response.readinto(buf)
+            if not n:
+                break
+            out_file.write(view[:n])
+
+
+async def _stream_download_async(url: str, dest: Path, timeout: float = 60) -> None:
+    """
+    Versão assíncrona de _stream_download: usa httpx (HTTP/2 quando disponível)
+    para não prender uma thread durante todo o download. Sem httpx instalado,
+    cai no download síncrono em thread.
+    """
+    try:
+        import httpx  # type: ignore
+    except ImportError:
+        await asyncio.to_thread(_stream_download, url, dest, timeout)
+        return
+
+    try:
+        import h2  # type: ignore  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+
+    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, http2=http2) as client:
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            with open(dest, "wb", buffering=0) as out_file:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    await asyncio.to_thread(out_file.write, chunk)
+
+
+def _resolve_redirects(url: str, timeout: float = 15, max_hops: int = 10) -> str:
+    """
+    Resolve a cadeia de redirects (ex.: asset do GitHub -> URL assinada do CDN) só com HEADs.
+    O urllib refaz o redirect como GET (e o corpo inteiro começaria a vir), então cada
+    salto é seguido à mão, lendo o Location da resposta 3xx.
+    Em caso de falha devolve a URL original.
+    """
+    from urllib.error import HTTPError
+    from urllib.parse import urljoin
+    from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+    class _NoRedirect(HTTPRedirectHandler):
+        def redirect_request(self, req, fp, code, msg, headers, newurl):
+            return None  # 3xx vira HTTPError, tratado abaixo
+
+    opener = build_opener(_NoRedirect)
+    current = url
+    try:
+        for _ in range(max_hops):
+            try:
+                with opener.open(Request(current, method="HEAD"), timeout=timeout):
+                    return current
+            except HTTPError as e:
+                location = e.headers.get("Location") if e.code in (301, 302, 303, 307, 308) else None
+                e.close()
+                if not location:
+                    raise
+                current = urljoin(current, location)
+    except Exception:
+        return url
+    return url
+
+
+async def _download_asset(url: str, dest: Path, timeout: float = 60) -> None:
+    """
+    Baixa um asset de release: resolve o redirect uma vez e, se houver aria2c no PATH,
+    usa várias conexões em paralelo; senão faz o streaming normal.
+    """
+    final_url = await asyncio.to_thread(_resolve_redirects, url)
+    aria2 = shutil.which("aria2c")
+    if aria2:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                aria2,
+                "-x", "8",
+                "-s", "8",
+                "-k", "1M",
+                "--allow-overwrite=true",
+                "--auto-file-renaming=false",
+                "--console-log-level=warn",
+                "--summary-interval=0",
+                f"--timeout={int(timeout)}",
+                "-d", str(dest.parent),
+                "-o", dest.name,
+                final_url,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL,
+                startupinfo=WIN_HIDDEN_STARTUPINFO,
+                creationflags=WIN_CREATE_NO_WINDOW,
+            )
+            if await process.wait() == 0 and dest.exists():
+                return
+        except Exception as e:
+            print(f"aria2c falhou, usando download direto: {e}")
+    await _stream_download_async(final_url, dest, timeout)
+
+
 async def run_ytdlp_update_task():
     try:
         ws_manager.broadcast_threadsafe({"ytdlp_status": "Iniciando atualização do yt-dlp..."})
@@ -138,16 +346,14 @@ async def run_ytdlp_update_task():
 
         ws_manager.broadcast_threadsafe({"ytdlp_status": f"Baixando {latest.version}..."})
 
-        # 2. Baixar para temp
-        tmp_dir = Path(tempfile.gettempdir()) / "ud_ytdlp_update"
-        tmp_dir.mkdir(exist_ok=True)
+        # 2. Baixar para uma pasta de staging no mesmo volume do binário
+        #    (a troca final vira um rename atômico, sem cópia entre discos)
+        target = YTDLP_EXE
+        tmp_dir = target.parent / ".ud_stage"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
         tmp_file = tmp_dir / asset_name
         
-        def download_file():
-            with urlopen(asset_url, timeout=60) as response, open(tmp_file, "wb") as out_file:
-                shutil.copyfileobj(response, out_file)
-                
-        await asyncio.to_thread(download_file)
+        await _download_asset(asset_url, tmp_file, 60)
         
         ws_manager.broadcast_threadsafe({"ytdlp_status": "Verificando integridade..."})
         if not tmp_file.exists() or tmp_file.stat().st_size < 1000:
@@ -156,7 +362,6 @@ async def run_ytdlp_update_task():
         # 3. Substituir
         ws_manager.broadcast_threadsafe({"ytdlp_status": "Substituindo binário..."})
         
-        target = YTDLP_EXE
         backup = target.with_suffix(".bak")
         
         # Tenta renomear o atual para .bak (windows não deixa sobrescrever exe em uso, mas deixa renomear)
@@ -170,7 +375,7 @@ async def run_ytdlp_update_task():
                 pass
         
         try:
-            shutil.move(str(tmp_file), str(target))
+            os.replace(tmp_file, target)
             # Se sucesso, tenta remover backup
             if backup.exists():
                 try:
@@ -183,6 +388,7 @@ async def run_ytdlp_update_task():
                 backup.rename(target)
             raise e
             
+        _ytdlp_version_for.cache_clear()
         new_ver = await asyncio.to_thread(get_local_ytdlp_version)
         ws_manager.broadcast_threadsafe({
             "ytdlp_status": "Concluído", 
@@ -194,12 +400,18 @@ async def run_ytdlp_update_task():
         print(f"Erro update yt-dlp: {e}")
         ws_manager.broadcast_threadsafe({"ytdlp_status": f"Erro: {str(e)}"})
 
+# Update do yt-dlp em andamento (um por vez: cliques repetidos não disparam downloads paralelos)
+_YTDLP_UPDATE_TASK: Optional[asyncio.Task] = None
+
+
 @app.post("/ytdlp/update")
-async def update_ytdlp_endpoint(background_tasks: BackgroundTasks):
-    background_tasks.add_task(run_ytdlp_update_task)
+async def update_ytdlp_endpoint():
+    global _YTDLP_UPDATE_TASK
+    if _YTDLP_UPDATE_TASK and not _YTDLP_UPDATE_TASK.done():
+        return {"status": "already running"}
+    _YTDLP_UPDATE_TASK = asyncio.create_task(run_ytdlp_update_task())
     return {"status": "Update started"}
 
-app = FastAPI(title="Ultra Downloader Backend", version="1.0")
 
 app.add_middleware(
     CORSMiddleware,
@@ -216,53 +428,185 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding aceita gzip? Respeita q-values ("gzip;q=0" recusa) e o curinga '*'."""
+    wildcard = False
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding in ("gzip", "x-gzip"):
+            return q > 0
+        if coding == "*":
+            wildcard = q > 0
+    return wildcard
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles que entrega o irmão .gz gerado no build (vite.config.js) quando o
+    cliente aceita gzip. Os .gz são indexados uma vez, na montagem.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._gzipped: set[str] = set()
+        if self.directory:
+            root = Path(self.directory)
+            for gz in root.rglob("*.gz"):
+                self._gzipped.add(gz.relative_to(root).with_suffix("").as_posix())
+
+    async def get_response(self, path: str, scope) -> Response:
+        rel = Path(path).as_posix()
+        request_headers = Headers(scope=scope)
+        # Métodos fora de GET/HEAD seguem para o StaticFiles, que responde 405
+        if (
+            scope["method"] in ("GET", "HEAD")
+            and rel in self._gzipped
+            and _accepts_gzip(request_headers.get("accept-encoding", ""))
+        ):
+            gz_path = Path(self.directory) / f"{rel}.gz"
+            try:
+                stat_result = await asyncio.to_thread(os.stat, gz_path)
+            except OSError:
+                return await super().get_response(path, scope)
+            media_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+            response = FileResponse(
+                gz_path,
+                media_type=media_type,
+                stat_result=stat_result,
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return await super().get_response(path, scope)
+
+
 # Servir assets do build do frontend (se existirem)
 if FRONTEND_DIST.exists():
     assets_dir = FRONTEND_DIST / "assets"
     if assets_dir.exists():
-        app.mount("/assets", StaticFiles(directory=str(assets_dir)), name="assets")
+        app.mount("/assets", PrecompressedStaticFiles(directory=str(assets_dir)), name="assets")
 
 
 # ======================================================================================
 # WebSocket manager (broadcast seguro a partir de threads)
 # ======================================================================================
 
+def _dumps_text(payload: dict) -> str:
+    """JSON compacto para frames de texto do WebSocket (orjson quando disponível)."""
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
 class WSManager:
+    # Payloads só de progresso (sem saved_path, erros, etc.) podem ser agrupados:
+    # por "task" vale apenas o mais recente, enviado a cada FLUSH_INTERVAL.
+    COALESCE_KEYS = frozenset({"task", "status", "progress"})
+    FLUSH_INTERVAL = 0.05
+
     def __init__(self) -> None:
         self.active: set[WebSocket] = set()
+        # Cópia imutável de 'active', refeita só em connect/disconnect (broadcast não aloca)
+        self._snapshot: tuple[WebSocket, ...] = ()
         self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: dict[str, dict] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+        # Lotes prontos para envio; um único _drain consome em ordem
+        self._queue: Optional[asyncio.Queue] = None
+        self._drain_task: Optional[asyncio.Task] = None
 
     def set_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Deve ser chamado de dentro do loop (startup)."""
         self._loop = loop
+        self._queue = asyncio.Queue()
+        self._drain_task = loop.create_task(self._drain())
 
     async def connect(self, ws: WebSocket):
         # Aceita sem checar origin (evita 403)
         await ws.accept()
         self.active.add(ws)
+        self._snapshot = tuple(self.active)
 
     def disconnect(self, ws: WebSocket):
-        self.active.discard(ws)
+        if ws in self.active:
+            self.active.discard(ws)
+            self._snapshot = tuple(self.active)
 
     async def _broadcast(self, payload: dict):
-        dead: List[WebSocket] = []
-        for ws in list(self.active):
+        targets = self._snapshot
+        if not targets:
+            return
+        # Serializa uma vez e envia para todos em paralelo (um cliente lento não atrasa os demais)
+        data = _dumps_text(payload)
+        results = await asyncio.gather(
+            *(ws.send_text(data) for ws in targets),
+            return_exceptions=True,
+        )
+        for ws, result in zip(targets, results):
+            if isinstance(result, Exception):
+                self.disconnect(ws)
+
+    async def _broadcast_many(self, payloads: List[dict]):
+        for payload in payloads:
+            await self._broadcast(payload)
+
+    async def _drain(self):
+        while True:
+            batch = await self._queue.get()
             try:
-                await ws.send_json(payload)
+                await self._broadcast_many(batch)
             except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.disconnect(ws)
+                pass
+
+    def _flush_pending(self):
+        # Roda no loop (agendado via call_later)
+        with self._pending_lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+            self._flush_scheduled = False
+        if batch:
+            self._queue.put_nowait(batch)
 
     def broadcast_threadsafe(self, payload: dict):
         """
         Pode ser chamado de QUALQUER thread (ex.: hooks do yt-dlp).
+        Atualizações só de progresso são agrupadas; as demais saem na hora,
+        precedidas do progresso pendente da mesma task para manter a ordem.
         """
-        if self._loop and self._loop.is_running():
-            try:
-                asyncio.run_coroutine_threadsafe(self._broadcast(payload), self._loop)
-            except RuntimeError:
-                # loop não disponível — ignora silenciosamente
-                pass
+        loop = self._loop
+        if not (loop and loop.is_running() and self._queue is not None):
+            return
+        key = str(payload.get("task") or "default")
+        batch: Optional[List[dict]] = None
+        with self._pending_lock:
+            if payload.keys() <= self.COALESCE_KEYS:
+                self._pending[key] = payload
+                if self._flush_scheduled:
+                    return
+                self._flush_scheduled = True
+            else:
+                pending = self._pending.pop(key, None)
+                batch = [pending, payload] if pending else [payload]
+        try:
+            if batch is None:
+                loop.call_soon_threadsafe(loop.call_later, self.FLUSH_INTERVAL, self._flush_pending)
+            else:
+                loop.call_soon_threadsafe(self._queue.put_nowait, batch)
+        except RuntimeError:
+            # loop não disponível — ignora silenciosamente
+            with self._pending_lock:
+                self._flush_scheduled = False
 
 
 ws_manager = WSManager()
@@ -273,29 +617,30 @@ UPDATER = UpdateManager(
     repo="lucasjordaoreal/YouTube-Downloader-Tool---yt_dlp-GUI",
     current_version=APP_VERSION,
     include_prereleases=False,
+    cache_dir=user_cache_dir(),
 )
 
 YTDLP_UPDATER = UpdateManager(
     repo="yt-dlp/yt-dlp",
     current_version="0.0.0",
     include_prereleases=False,
+    cache_dir=user_cache_dir(),
 )
 
-def get_local_ytdlp_version() -> str:
+@functools.lru_cache(maxsize=4)
+def _ytdlp_version_for(path: str, mtime: float, size: int) -> str:
+    """
+    Executa `yt-dlp --version` uma única vez por binário (chave: caminho, mtime, tamanho).
+    """
     try:
-        cmd = [str(YTDLP_EXE), "--version"]
-        # Cria startupinfo para esconder janela no Windows
-        startupinfo = None
-        if sys.platform == "win32":
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-        
+        cmd = [path, "--version"]
         cp = subprocess.run(
             cmd, 
             capture_output=True, 
             text=True, 
             check=False,
-            startupinfo=startupinfo
+            startupinfo=WIN_HIDDEN_STARTUPINFO,
+            creationflags=WIN_CREATE_NO_WINDOW,
         )
         if cp.returncode == 0:
             return cp.stdout.strip()
@@ -304,6 +649,36 @@ def get_local_ytdlp_version() -> str:
     return "0.0.0"
 
 
+@functools.lru_cache(maxsize=1)
+def _ytdlp_package_version() -> Optional[str]:
+    """
+    Versão do pacote yt_dlp importável (o mesmo usado em _download_one), sem abrir processo.
+    Tenta os metadados do pip antes de importar o pacote, que é bem mais pesado.
+    """
+    try:
+        from importlib.metadata import version
+
+        return version("yt-dlp")
+    except Exception:
+        pass
+    try:
+        from yt_dlp.version import __version__
+
+        return str(__version__)
+    except Exception:
+        return None
+
+
+def get_local_ytdlp_version() -> str:
+    # O binário yt-dlp.exe é o que o update substitui, então é ele que manda quando existe;
+    # sem ele, responde com a versão do pacote em vez de tentar um spawn que vai falhar.
+    try:
+        st = YTDLP_EXE.stat()
+    except OSError:
+        return _ytdlp_package_version() or "0.0.0"
+    return _ytdlp_version_for(str(YTDLP_EXE), st.st_mtime, st.st_size)
+
+
 # check_and_cache_update removido
 
 
@@ -313,15 +688,20 @@ async def _on_startup():
     loop = asyncio.get_running_loop()
     ws_manager.set_loop(loop)
 
-    # Limpeza de arquivos antigos de update (.old)
+    # Limpeza de arquivos antigos de update (.old), fora do event loop
+    def _remove_quiet(path: str) -> None:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
     try:
         if getattr(sys, "frozen", False):
             base_dir = Path(sys.executable).parent
-            for old_file in base_dir.glob("*.old"):
-                try:
-                    os.remove(old_file)
-                except Exception:
-                    pass
+            with os.scandir(base_dir) as it:
+                old_files = [e.path for e in it if e.name.endswith(".old") and e.is_file()]
+            if old_files:
+                await asyncio.gather(*(asyncio.to_thread(_remove_quiet, p) for p in old_files))
     except Exception:
         pass
 
@@ -336,7 +716,8 @@ async def _on_startup():
 
         try:
             # 1. Checar versão
-            latest = await asyncio.to_thread(UPDATER.get_latest_release, False)
+            # use_cache=True: no boot, o cache em disco (<6 h) evita ir ao GitHub
+            latest = await asyncio.to_thread(UPDATER.get_latest_release, True)
             if not latest:
                 return
             
@@ -365,21 +746,17 @@ async def _on_startup():
                 return
 
             # 3. Baixar silenciosamente
-            tmp_dir = Path(tempfile.gettempdir()) / "ud_update_stage"
+            current_exe = Path(sys.executable)
+            tmp_dir = current_exe.parent / ".ud_stage"
             tmp_dir.mkdir(exist_ok=True)
             tmp_file = tmp_dir / asset_name
             
-            def download_update():
-                with urlopen(asset_url, timeout=120) as response, open(tmp_file, "wb") as out_file:
-                    shutil.copyfileobj(response, out_file)
-            
-            await asyncio.to_thread(download_update)
+            await _download_asset(asset_url, tmp_file, 120)
             
             if not tmp_file.exists() or tmp_file.stat().st_size < 10000:
                 return # Download falhou
 
             # 4. Substituição Atômica (Rename + Move + Restart)
-            current_exe = Path(sys.executable)
             old_exe = current_exe.with_suffix(".exe.old")
             
             # Renomeia executável atual (Windows permite renomear em uso)
@@ -392,7 +769,7 @@ async def _on_startup():
             current_exe.rename(old_exe)
             
             # Move o novo para o lugar do atual
-            shutil.move(str(tmp_file), str(current_exe))
+            os.replace(tmp_file, current_exe)
             
             # 5. Reiniciar Aplicação
             subprocess.Popen([str(current_exe)] + sys.argv[1:])
@@ -422,6 +799,24 @@ async def _on_startup():
     
     loop.create_task(_silent_ytdlp_check())
 
+    # Detecta encoders de GPU em segundo plano para a primeira compressão não travar o loop
+    async def _warm_hw_encoders():
+        try:
+            await asyncio.to_thread(_detect_hw_encoders)
+        except Exception:
+            pass
+
+    loop.create_task(_warm_hw_encoders())
+
+
+@app.on_event("shutdown")
+async def _on_shutdown():
+    # Downloads pendentes são descartados e os em andamento, cancelados: as threads do
+    # pool não são daemon e segurariam o encerramento do processo.
+    for token in list(DOWNLOAD_TOKENS):
+        token.cancel()
+    DOWNLOAD_POOL.shutdown(wait=False, cancel_futures=True)
+
 
 # ======================================================================================
 # Cancelamento
@@ -439,6 +834,9 @@ class CancelToken:
         self._ev.set()
     def is_cancelled(self) -> bool:
         return self._ev.is_set()
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até o cancelamento (ou timeout); retorna True se cancelado."""
+        return self._ev.wait(timeout)
 
 
 ACTIVE_TOKEN: Optional[CancelToken] = None  # token atual (download único ou fila)
@@ -453,42 +851,184 @@ def _ensure_dir(p: Path) -> Path:
     return p
 
 
-DEFAULT_COMPRESS_DIR = _ensure_dir(ROOT_DIR / "downloads" / "compressed")
-
-def _is_instagram_url(value: str | None) -> bool:
-    if not value:
-        return False
-    return bool(INSTAGRAM_HOST_RE.search(str(value)))
+@functools.lru_cache(maxsize=32)
+def _output_dir_str(target_dir: Path) -> str:
+    """Cria a pasta de saída só na primeira vez que aparece e devolve o caminho em texto."""
+    return os.fspath(_ensure_dir(target_dir))
 
 
-def _is_facebook_url(value: str | None) -> bool:
-    if not value:
-        return False
-    return bool(FACEBOOK_HOST_RE.search(str(value)))
-
+def _env_int(name: str, default: int, lo: int, hi: int) -> int:
+    try:
+        value = int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        value = default
+    return max(lo, min(hi, value))
 
-def _is_twitter_url(value: str | None) -> bool:
-    if not value:
-        return False
-    return bool(TWITTER_HOST_RE.search(str(value)))
 
-def _read_clipboard() -> str:
+DEFAULT_COMPRESS_DIR = _ensure_dir(ROOT_DIR / "downloads" / "compressed")
+# Fragmentos HLS/DASH baixados em paralelo por item (-N do yt-dlp)
+YTDLP_FRAGMENT_WORKERS = _env_int("UD_FRAGMENTS", 8, 1, 16)
+# Itens da fila baixados ao mesmo tempo
+YTDLP_PARALLEL_DOWNLOADS = _env_int("UD_PARALLEL", 4, 1, 8)
+# Pool único para /download e /queue: limita quantos yt-dlp rodam ao mesmo tempo,
+# não importa quantas requisições cheguem (o excedente espera na fila do pool).
+DOWNLOAD_POOL = ThreadPoolExecutor(max_workers=YTDLP_PARALLEL_DOWNLOADS, thread_name_prefix="ud-download")
+DOWNLOAD_TOKENS: "weakref.WeakSet[CancelToken]" = weakref.WeakSet()
+
+def classify_host(url: str | None) -> str:
     """
-    Tenta ler o conteúdo de texto da área de transferência.
-    Usa Tkinter quando disponível (mesma dependência do seletor de diretório)
-    e possui fallback para Windows via PowerShell.
+    Retorna "instagram", "facebook", "twitter" ou "" conforme a plataforma da URL.
+    Faz um único parse + lookups por sufixo de domínio; a regex só entra quando não há hostname.
     """
+    if not url:
+        return ""
+    value = str(url).strip()
+    try:
+        host = urlsplit(value if "://" in value else f"https://{value}").hostname or ""
+    except ValueError:
+        host = ""
+    if host:
+        # host == domínio ou host termina em "." + domínio
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            kind = URL_HOST_KIND.get(".".join(labels[i:]))
+            if kind:
+                return kind
+        return ""
+    m = HOST_RE.search(value)
+    return (m.lastgroup or "") if m else ""
+
+_TK_REQUESTS: Optional[queue.Queue] = None
+_TK_START_LOCK = threading.Lock()
+
+
+def _tk_worker(requests: queue.Queue) -> None:
+    # Tk só pode ser usado pela thread que criou o interpretador: uma raiz oculta,
+    # criada uma vez, atende todos os pedidos (seletor de pasta, clipboard).
     try:
         import tkinter as tk  # type: ignore
 
         root = tk.Tk()
         root.withdraw()
+        error: Optional[BaseException] = None
+    except Exception as exc:
+        root, error = None, exc
+    while True:
+        fn, fut = requests.get()
+        if root is None:
+            fut.set_exception(error or RuntimeError("Tkinter indisponível"))
+            continue
         try:
-            data = root.clipboard_get()  # type: ignore[attr-defined]
-        except Exception:
-            data = ""
+            fut.set_result(fn(root))
+        except BaseException as exc:
+            fut.set_exception(exc)
+
+
+def _tk_call(fn: Callable, timeout: Optional[float] = None):
+    """Executa fn(root) na thread do Tk (inicia na primeira chamada) e devolve o resultado."""
+    global _TK_REQUESTS
+    with _TK_START_LOCK:
+        if _TK_REQUESTS is None:
+            _TK_REQUESTS = queue.Queue()
+            threading.Thread(target=_tk_worker, args=(_TK_REQUESTS,), name="ud-tk", daemon=True).start()
+    fut: Future = Future()
+    _TK_REQUESTS.put((fn, fut))
+    return fut.result(timeout)
+
+
+@functools.lru_cache(maxsize=1)
+def _win32_clipboard_api():
+    """Carrega user32/kernel32 uma vez, com assinaturas corretas para handles de 64 bits."""
+    import ctypes
+    from ctypes import wintypes
+
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    user32.OpenClipboard.argtypes = [wintypes.HWND]
+    user32.OpenClipboard.restype = wintypes.BOOL
+    user32.CloseClipboard.argtypes = []
+    user32.CloseClipboard.restype = wintypes.BOOL
+    user32.GetClipboardData.argtypes = [wintypes.UINT]
+    user32.GetClipboardData.restype = wintypes.HANDLE
+    kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalLock.restype = wintypes.LPVOID
+    kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+    kernel32.GlobalUnlock.restype = wintypes.BOOL
+    return ctypes, user32, kernel32
+
+
+def _win_clipboard() -> Optional[str]:
+    """
+    Lê CF_UNICODETEXT direto da API Win32 (sem subir Tk ou PowerShell).
+    Retorna None se a área de transferência não puder ser aberta.
+    """
+    CF_UNICODETEXT = 13
+    ctypes, user32, kernel32 = _win32_clipboard_api()
+    # Outro processo pode estar segurando o clipboard por alguns ms
+    for _ in range(5):
+        if user32.OpenClipboard(None):
+            break
+        time.sleep(0.01)
+    else:
+        return None
+    try:
+        handle = user32.GetClipboardData(CF_UNICODETEXT)
+        if not handle:
+            return ""
+        ptr = kernel32.GlobalLock(handle)
+        if not ptr:
+            return ""
+        try:
+            return ctypes.wstring_at(ptr)
         finally:
-            root.destroy()
+            kernel32.GlobalUnlock(handle)
+    finally:
+        user32.CloseClipboard()
+
+
+def _cli_clipboard() -> Optional[str]:
+    """macOS/Linux: usa pbpaste, wl-paste, xclip ou xsel se algum estiver instalado."""
+    if sys.platform == "darwin":
+        candidates = [["pbpaste"]]
+    else:
+        candidates = [
+            ["wl-paste", "--no-newline"],
+            ["xclip", "-selection", "clipboard", "-o"],
+            ["xsel", "--clipboard", "--output"],
+        ]
+    for cmd in candidates:
+        if not shutil.which(cmd[0]):
+            continue
+        try:
+            cp = subprocess.run(cmd, capture_output=True, text=True, timeout=2)
+        except Exception:
+            continue
+        if cp.returncode == 0:
+            return cp.stdout or ""
+    return None
+
+
+def _read_clipboard() -> str:
+    """
+    Tenta ler o conteúdo de texto da área de transferência.
+    Windows: API Win32 via ctypes; macOS/Linux: ferramentas de linha de comando.
+    Fallbacks: Tkinter (mesma dependência do seletor de diretório) e, no Windows, PowerShell.
+    """
+    try:
+        data = _win_clipboard() if sys.platform.startswith("win") else _cli_clipboard()
+        if data is not None:
+            return data
+    except Exception:
+        pass
+
+    try:
+        def _tk_clipboard(root) -> str:
+            try:
+                return root.clipboard_get()  # type: ignore[attr-defined]
+            except Exception:
+                return ""
+
+        data = _tk_call(_tk_clipboard, timeout=2)
         if isinstance(data, str):
             return data
         return str(data or "")
@@ -507,6 +1047,8 @@ def _read_clipboard() -> str:
                 capture_output=True,
                 text=True,
                 timeout=2,
+                startupinfo=WIN_HIDDEN_STARTUPINFO,
+                creationflags=WIN_CREATE_NO_WINDOW,
             )
             if cp.returncode == 0:
                 return cp.stdout or ""
@@ -516,13 +1058,16 @@ def _read_clipboard() -> str:
     return ""
 
 
+# Caracteres inválidos em nomes de arquivo (controle + reservados do Windows) -> removidos
+_FILENAME_DELETE_TABLE = dict.fromkeys([*range(0x20), *map(ord, '<>:"/\\|?*')])
+
+
 def _sanitize_filename(name: str) -> Optional[str]:
     """
     Remove caracteres inválidos para nomes de arquivo e normaliza espaços.
     Retorna None se o resultado ficar vazio.
     """
-    cleaned = re.sub(r'[<>:"/\\|?*\x00-\x1F]', "", name or "")
-    cleaned = re.sub(r"\s+", " ", cleaned).strip().strip(".")
+    cleaned = " ".join((name or "").translate(_FILENAME_DELETE_TABLE).split()).strip(".")
     if not cleaned:
         return None
     return cleaned[:120]
@@ -532,6 +1077,25 @@ def _expected_extension(fmt: str) -> str:
     return fmt_lower if fmt_lower in AUDIO_FORMATS else "mp4"
 
 
+_PP_METADATA_ARGS = ("-metadata", "comment=UltraDownloader")
+
+
+@functools.lru_cache(maxsize=32)
+def _video_format_selector(resolution: str) -> str:
+    """Seletor de formato do yt-dlp para a resolução pedida (ex: '1080p'); poucas variações, então fica em cache."""
+    height = None
+    if resolution.endswith("p") and resolution[:-1].isdecimal():
+        height = int(resolution[:-1])
+
+    if height:
+        video_part = f"bv*[height<={height}][vcodec^=avc][ext=mp4]"
+    else:
+        video_part = "bv*[vcodec^=avc][ext=mp4]"
+
+    # Enforce MP4 (H.264 + AAC)
+    return f"{video_part}+ba[ext=m4a]/mp4"
+
+
 def _build_yt_args(
     fmt: str,
     resolution: str,
@@ -544,23 +1108,23 @@ def _build_yt_args(
     Retorna as opcoes do YoutubeDL conforme formato (video/audio).
     Agora inclui embed de capas automaticamente para MP3 e M4A.
     """
-    target_dir = _ensure_dir(target_dir)
     fmt_lower = fmt.lower()
     expected_ext = _expected_extension(fmt)
-    outtmpl = str(target_dir / ("%(title)s.%(ext)s" if simple_mode else f"%(title)s.{expected_ext}"))
+    name_tmpl = "%(title)s.%(ext)s" if simple_mode else f"%(title)s.{expected_ext}"
+    outtmpl = os.path.join(_output_dir_str(target_dir), name_tmpl)
 
     common = {
-        "ffmpeg_location": str(FFMPEG_EXE.parent),
+        "ffmpeg_location": FFMPEG_DIR_STR,
         "outtmpl": {"default": outtmpl},
         "noprogress": True,
-        "concurrent_fragment_downloads": 3,
+        "concurrent_fragment_downloads": YTDLP_FRAGMENT_WORKERS,
         "retries": 10,
         "fragment_retries": 10,
         "ignore_no_formats_error": True,
         "no_warnings": True,
         "quiet": True,
         "windowsfilenames": True,
-        "postprocessor_args": ["-metadata", "comment=UltraDownloader"],
+        "postprocessor_args": {"default": list(_PP_METADATA_ARGS)},
     }
 
     if simple_mode:
@@ -591,21 +1155,14 @@ def _build_yt_args(
         return {**common, "format": "bestaudio/best", "postprocessors": pp}
 
     # === VIDEO ===
-    height = None
-    if isinstance(resolution, str) and resolution.endswith("p") and resolution[:-1].isdigit():
-        try:
-            height = int(resolution[:-1])
-        except ValueError:
-            height = None
-
-    if height:
-        video_part = f"bv*[height<={height}][vcodec^=avc][ext=mp4]"
-    else:
-        video_part = "bv*[vcodec^=avc][ext=mp4]"
-    
-    # Enforce MP4 (H.264 + AAC)
-    format_selector = f"{video_part}+ba[ext=m4a]/mp4"
+    format_selector = _video_format_selector(resolution if isinstance(resolution, str) else "")
 
+    # O FFmpegMetadata já regrava o MP4 inteiro com -c copy; aproveita essa passada
+    # para mover o moov para o início em vez de pedir outra ao remuxer.
+    common["postprocessor_args"] = {
+        "default": list(_PP_METADATA_ARGS),
+        "metadata": [*_PP_METADATA_ARGS, "-movflags", "+faststart"],
+    }
     return {
         **common,
         "format": format_selector,
@@ -625,36 +1182,31 @@ def _bool_from(value) -> bool:
     return str(value).strip().lower() in {"1", "true", "on", "yes", "y", "sim"}
 
 
+_RESOLUTION_SENTINELS = frozenset({"auto", "original", "source", "none", ""})
+
+
 def _parse_resolution_token(token: Optional[str]) -> Optional[int]:
     if not token:
         return None
     token = str(token).strip().lower()
-    if token in {"auto", "original", "source", "none"}:
+    if token in _RESOLUTION_SENTINELS:
         return None
-    if token.endswith("p") and token[:-1].isdigit():
-        try:
-            return max(144, int(token[:-1]))
-        except ValueError:
-            return None
-    if token.isdigit():
-        try:
-            return max(144, int(token))
-        except ValueError:
-            return None
-    return None
+    digits = token[:-1] if token.endswith("p") else token
+    # isdecimal (e não isdigit) garante que int() aceita o texto
+    return max(144, int(digits)) if digits.isdecimal() else None
+
+
+_BYTE_UNITS = ("B", "KB", "MB", "GB", "TB")
 
 
 def _format_bytes(num: int) -> str:
     if num <= 0:
         return "0 B"
-    units = ["B", "KB", "MB", "GB", "TB"]
-    idx = 0
-    value = float(num)
-    while value >= 1024 and idx < len(units) - 1:
-        value /= 1024.0
-        idx += 1
+    # Cada unidade equivale a 10 bits: o índice sai direto do bit_length
+    idx = min(max(int(num).bit_length() - 1, 0) // 10, len(_BYTE_UNITS) - 1)
+    value = num / (1 << (idx * 10))
     precision = 0 if idx == 0 else (1 if value >= 10 else 2)
-    return f"{value:.{precision}f} {units[idx]}"
+    return f"{value:.{precision}f} {_BYTE_UNITS[idx]}"
 
 
 def maybe_update_ytdlp():
@@ -669,17 +1221,46 @@ def maybe_update_ytdlp():
                 check=False,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
+                startupinfo=WIN_HIDDEN_STARTUPINFO,
+                creationflags=WIN_CREATE_NO_WINDOW,
             )
     except Exception:
         pass
 
 
-def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None):
+# Intervalo mínimo entre emissões de progresso do hook do yt-dlp (segundos)
+PROGRESS_MIN_INTERVAL = 0.1
+
+# Campos do outtmpl que sabemos expandir ao procurar o arquivo final
+_YT_TMPL_RE = re.compile(r"%\((title|final_ext|ext|id|uploader)\)s")
+
+
+# Classe YoutubeDL resolvida uma única vez; o import do yt_dlp é pesado e
+# continua adiado até o primeiro download/inspeção para não atrasar o boot.
+_YoutubeDL = None
+
+
+def _get_youtube_dl():
+    global _YoutubeDL
+    if _YoutubeDL is None:
+        from yt_dlp import YoutubeDL
+
+        _YoutubeDL = YoutubeDL
+    return _YoutubeDL
+
+
+def _download_one(
+    url: str,
+    ydl_opts: dict,
+    token: Optional[CancelToken] = None,
+    progress_cb: Optional[Callable[[str, float], None]] = None,
+):
     """
     Baixa um unico item com yt-dlp e emite progresso no WebSocket.
     Tambem tenta enviar 'saved_path' assim que o yt-dlp informar 'filename'
     no hook (status 'finished'), com fallback apos o download.
     Se 'token' estiver cancelado, aborta elegantemente.
+    Com 'progress_cb', o progresso vai para o callback (ex.: agregado da fila) em vez do WS.
     """
 
     def _guess_expected_ext(template: Optional[str]) -> Optional[str]:
@@ -700,6 +1281,19 @@ def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None)
                     return str(ext).strip('.') or None
         return None
 
+    # Ultimo progresso emitido: (instante, status, pct arredondado)
+    last_emit = [0.0, None, None]
+
+    def _emit_done(saved_path: Optional[Path] = None) -> None:
+        if progress_cb:
+            # Na fila o item so conta como 100% no agregado; a mensagem final vem do on_done
+            progress_cb('Baixando.', 100.0)
+            return
+        payload = {'status': 'Concluindo', 'progress': 100.0}
+        if saved_path:
+            payload['saved_path'] = str(saved_path)
+        ws_manager.broadcast_threadsafe(payload)
+
     # Progress hook (chamado pelo yt-dlp em thread corrente)
     def _hook(d: dict):
         # Cancelamento rapido (checa varias vezes por segundo)
@@ -709,15 +1303,28 @@ def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None)
         try:
             status = d.get('status')
             if status in {'downloading', 'processing'}:
+                # O yt-dlp chama o hook centenas de vezes/s: limita a ~10 Hz
+                # e descarta valores repetidos (mudança de status sempre passa)
+                now = time.monotonic()
+                if status == last_emit[1] and now - last_emit[0] < PROGRESS_MIN_INTERVAL:
+                    return
                 total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
                 downloaded = d.get('downloaded_bytes') or 0
                 pct = 0.0
                 if total:
                     pct = max(0.0, min(100.0, downloaded * 100.0 / total))
-                ws_manager.broadcast_threadsafe({
-                    'status': 'Baixando.' if status == 'downloading' else 'Processando.',
-                    'progress': round(pct, 1),
-                })
+                pct = round(pct, 1)
+                if status == last_emit[1] and pct == last_emit[2]:
+                    return
+                last_emit[:] = (now, status, pct)
+                status_text = 'Baixando.' if status == 'downloading' else 'Processando.'
+                if progress_cb:
+                    progress_cb(status_text, pct)
+                else:
+                    ws_manager.broadcast_threadsafe({
+                        'status': status_text,
+                        'progress': pct,
+                    })
 
             elif status == 'finished':
                 # Muitos casos ja trazem o caminho final aqui:
@@ -727,18 +1334,14 @@ def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None)
                     or info_dict.get('filepath')
                     or info_dict.get('_filename')
                 )
-                payload = {'status': 'Concluindo', 'progress': 100.0}
-                if fn:
-                    p = Path(fn)
-                    if p.exists():
-                        payload['saved_path'] = str(p.resolve())
-                ws_manager.broadcast_threadsafe(payload)
+                p = Path(fn) if fn else None
+                _emit_done(p.resolve() if p and p.exists() else None)
 
         except Exception:
             # Nunca deixar o hook quebrar
             pass
 
-    from yt_dlp import YoutubeDL
+    YoutubeDL = _get_youtube_dl()
 
     opts = dict(ydl_opts)
     outtmpl_opt = opts.get('outtmpl', {})
@@ -765,25 +1368,40 @@ def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None)
             else:
                 expected_ext = None
 
-            # Fallback caso o hook nao tenha entregue o arquivo final:
+            # O yt-dlp informa o caminho final em requested_downloads/filepath;
+            # so monta candidatos a partir do template se nada disso existir.
             saved_path = None
-            if template:
-                title = info.get('title', 'video')
-                candidate = template
-                if '%(title)s' in candidate:
-                    candidate = candidate.replace('%(title)s', title)
-                if '%(final_ext)s' in candidate and expected_ext:
-                    candidate = candidate.replace('%(final_ext)s', expected_ext)
-                cp = Path(candidate)
-
-                candidate_paths = []
-                candidate_paths.append(cp)
+            known_paths = [
+                rd.get('filepath')
+                for rd in (info.get('requested_downloads') or [])
+                if isinstance(rd, dict)
+            ]
+            known_paths += [info.get('filepath'), info.get('_filename')]
+            for v in known_paths:
+                if isinstance(v, str) and v and Path(v).exists():
+                    saved_path = Path(v).resolve()
+                    break
+
+            # Fallback caso o hook nao tenha entregue o arquivo final:
+            if saved_path is None and template:
+                subs = {
+                    'title': info.get('title', 'video'),
+                    'final_ext': expected_ext,
+                    'ext': info.get('ext'),
+                    'id': info.get('id'),
+                    'uploader': info.get('uploader'),
+                }
+                # Campos sem valor ficam como estão no template
+                cp = Path(_YT_TMPL_RE.sub(
+                    lambda m: str(subs[m.group(1)] or m.group(0)), template
+                ))
+
+                candidate_paths = [cp]
+                seen = {str(cp)}
                 fallback_exts = [
                     expected_ext,
                     info.get('final_ext'),
                     info.get('ext'),
-                    _first_ext_from(info.get('requested_downloads')),
-                    _first_ext_from(info.get('requested_formats')),
                     'mp4',
                     'mp3',
                     'm4a',
@@ -797,21 +1415,18 @@ def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None)
                     if not ex_clean:
                         continue
                     try:
-                        candidate_paths.append(cp.with_suffix(f'.{ex_clean}'))
+                        cand = cp.with_suffix(f'.{ex_clean}')
                     except ValueError:
-                        candidate_paths.append(Path(f'{cp}.{ex_clean}'))
+                        cand = Path(f'{cp}.{ex_clean}')
+                    if str(cand) not in seen:
+                        seen.add(str(cand))
+                        candidate_paths.append(cand)
 
                 for cand in candidate_paths:
-                    if isinstance(cand, Path) and cand.exists():
+                    if cand.exists():
                         saved_path = cand.resolve()
                         break
 
-            for k in ('filepath', '_filename'):
-                v = info.get(k)
-                if isinstance(v, str) and Path(v).exists():
-                    saved_path = Path(v).resolve()
-                    break
-
             if saved_path and saved_path.exists():
                 if saved_path.suffix.upper() == '.NA' and expected_ext:
                     new_path = saved_path.with_suffix(f'.{expected_ext}')
@@ -821,23 +1436,17 @@ def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None)
                             saved_path = new_path
                         except Exception:
                             pass
-                ws_manager.broadcast_threadsafe({
-                    'status': 'Concluindo',
-                    'progress': 100.0,
-                    'saved_path': str(saved_path),
-                })
+                _emit_done(saved_path)
             else:
-                ws_manager.broadcast_threadsafe({
-                    'status': 'Concluindo',
-                    'progress': 100.0,
-                })
+                _emit_done()
 
     except CanceledByUser:
-        # Aviso de cancelamento
-        ws_manager.broadcast_threadsafe({
-            'status': 'Cancelado pelo usuario',
-            'progress': 0,
-        })
+        # Aviso de cancelamento (na fila, o on_done avisa uma vez so)
+        if not progress_cb:
+            ws_manager.broadcast_threadsafe({
+                'status': 'Cancelado pelo usuario',
+                'progress': 0,
+            })
         return
     except Exception as e:
         ws_manager.broadcast_threadsafe({
@@ -845,8 +1454,105 @@ def _download_one(url: str, ydl_opts: dict, token: Optional[CancelToken] = None)
         })
 
 
+def _download_many(
+    urls: List[str],
+    ydl_opts: dict,
+    token: CancelToken,
+    on_done: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Enfileira cada item no DOWNLOAD_POOL (cada worker com sua propria instancia do YoutubeDL)
+    e retorna na hora; 'on_done' roda quando o ultimo item terminar.
+    O progresso enviado ao WS e a media de todos os itens da fila.
+    Itens ainda na fila quando o token e cancelado sao pulados sem abrir o yt-dlp
+    (e nao contam como concluidos); a mensagem final, de conclusao ou cancelamento,
+    fica a cargo de 'on_done'.
+    """
+    if not urls:
+        if on_done:
+            on_done()
+        return
+
+    progress = [0.0] * len(urls)
+    remaining = [len(urls)]
+    lock = threading.Lock()
+    DOWNLOAD_TOKENS.add(token)
+
+    def _item_progress(idx: int):
+        def _cb(status_text: str, pct: float) -> None:
+            with lock:
+                progress[idx] = pct
+                overall = sum(progress) / len(progress)
+            ws_manager.broadcast_threadsafe({'status': status_text, 'progress': round(overall, 1)})
+        return _cb
+
+    def _worker(idx: int, u: str) -> None:
+        try:
+            if not token.is_cancelled():
+                cb = _item_progress(idx) if len(urls) > 1 else None
+                _download_one(u, ydl_opts, token, progress_cb=cb)
+        finally:
+            with lock:
+                if not token.is_cancelled():
+                    progress[idx] = 100.0
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and on_done:
+                on_done()
+
+    for idx, u in enumerate(urls):
+        DOWNLOAD_POOL.submit(_worker, idx, u)
+
+
+def _url_ext(url: str) -> str:
+    return Path(urlparse(url).path).suffix.lower().lstrip(".")
+
+
+def _entry_has_video(entry: dict) -> bool:
+    media_type = entry.get("media_type")
+    if media_type == "video" or str(media_type) == "2":
+        return True
+    if str(entry.get("resource") or "").lower() in {"video", "dash"}:
+        return True
+    if "video" in str(entry.get("type") or "").lower():
+        return True
+    if str(entry.get("ext") or "").lower() in VIDEO_EXTS:
+        return True
+    vcodec = str(entry.get("vcodec") or "").lower()
+    if vcodec and vcodec != "none":
+        return True
+    return any(
+        str(fmt.get("ext") or "").lower() in VIDEO_EXTS
+        or str(fmt.get("vcodec") or "none").lower() not in ("", "none")
+        for fmt in entry.get("formats") or []
+    )
+
+
+def _entry_has_image(entry: dict) -> bool:
+    media_type = entry.get("media_type")
+    if media_type == "image" or str(media_type) == "1":
+        return True
+    if str(entry.get("resource") or "").lower() in {"photo", "image"}:
+        return True
+    type_str = str(entry.get("type") or "").lower()
+    if "image" in type_str or "photo" in type_str:
+        return True
+    if str(entry.get("ext") or "").lower() in IMAGE_EXTS:
+        return True
+    if any(str(fmt.get("ext") or "").lower() in IMAGE_EXTS for fmt in entry.get("formats") or []):
+        return True
+    url = str(entry.get("url") or "")
+    if url and _url_ext(url) in IMAGE_EXTS:
+        return True
+    for thumb in entry.get("thumbnails") or []:
+        t_url = str(thumb.get("url") or "")
+        if t_url and _url_ext(t_url) in IMAGE_EXTS:
+            return True
+    return False
+
+
 def _summarize_instagram(url: str) -> dict:
-    from yt_dlp import YoutubeDL  # Import aqui para evitar custo desnecessário em módulos
+    YoutubeDL = _get_youtube_dl()
 
     opts = {
         "quiet": True,
@@ -873,66 +1579,9 @@ def _summarize_instagram(url: str) -> dict:
     video_count = 0
     image_count = 0
     for entry in entries:
-        ext = str(entry.get("ext") or "").lower()
-        vcodec = str(entry.get("vcodec") or "").lower()
-        formats = entry.get("formats") or []
-        url = str(entry.get("url") or "")
-        thumbnails = entry.get("thumbnails") or []
-        media_type = entry.get("media_type")
-        resource = str(entry.get("resource") or "").lower()
-        type_str = str(entry.get("type") or "").lower()
-
-        def _has_video() -> bool:
-            if str(media_type) == "2":
-                return True
-            if media_type == "video":
-                return True
-            if resource in {"video", "dash"}:
-                return True
-            if "video" in type_str:
-                return True
-            if ext in VIDEO_EXTS:
-                return True
-            if vcodec and vcodec != "none":
-                return True
-            for fmt in formats:
-                fmt_ext = str(fmt.get("ext") or "").lower()
-                fmt_vc = str(fmt.get("vcodec") or "").lower()
-                if fmt_ext in VIDEO_EXTS or (fmt_vc and fmt_vc != "none"):
-                    return True
-            return False
-
-        has_video = _has_video()
-
-        def _has_image() -> bool:
-            if str(media_type) == "1":
-                return True
-            if media_type == "image":
-                return True
-            if resource in {"photo", "image"}:
-                return True
-            if "image" in type_str or "photo" in type_str:
-                return True
-            if ext in IMAGE_EXTS:
-                return True
-            for fmt in formats:
-                fmt_ext = str(fmt.get("ext") or "").lower()
-                if fmt_ext in IMAGE_EXTS:
-                    return True
-            if url:
-                path_ext = Path(urlparse(url).path).suffix.lower().lstrip(".")
-                if path_ext in IMAGE_EXTS:
-                    return True
-            for thumb in thumbnails:
-                t_url = str(thumb.get("url") or "")
-                if not t_url:
-                    continue
-                path_ext = Path(urlparse(t_url).path).suffix.lower().lstrip(".")
-                if path_ext in IMAGE_EXTS:
-                    return True
-            return False
-
-        has_image = _has_image()
+        has_video = _entry_has_video(entry)
+        # Imagem só conta quando não há vídeo: evita a checagem se já classificou
+        has_image = not has_video and _entry_has_image(entry)
         if not has_video and not has_image:
             if not entry.get("duration") and entry.get("thumbnail"):
                 has_image = True
@@ -948,71 +1597,386 @@ def _summarize_instagram(url: str) -> dict:
             image_count += 1
 
     return {
-        "is_carousel": info.get("_type") == "playlist",
-        "entry_count": len(entries),
-        "video_count": video_count,
-        "image_count": image_count,
-        "title": info.get("title"),
-        "uploader": info.get("uploader") or info.get("uploader_id"),
-        "description": info.get("description"),
+        "is_carousel": info.get("_type") == "playlist",
+        "entry_count": len(entries),
+        "video_count": video_count,
+        "image_count": image_count,
+        "title": info.get("title"),
+        "uploader": info.get("uploader") or info.get("uploader_id"),
+        "description": info.get("description"),
+    }
+
+
+_MP4_MAX_MOOV_BYTES = 64 * 1024 * 1024
+
+
+def _iter_atoms(data: bytes):
+    """Percorre os atoms (caixas ISO-BMFF) de um bloco: gera (tipo, conteúdo)."""
+    pos, end = 0, len(data)
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield kind, data[pos + header:pos + size]
+        pos += size
+
+
+def _read_descriptor(data: bytes, pos: int) -> tuple[int, int, int]:
+    """Descritor MPEG-4 (dentro do esds): retorna (tag, início do conteúdo, tamanho)."""
+    tag = data[pos]
+    pos += 1
+    length = 0
+    for _ in range(4):
+        b = data[pos]
+        pos += 1
+        length = (length << 7) | (b & 0x7F)
+        if not b & 0x80:
+            break
+    return tag, pos, length
+
+
+def _mp4_audio_info(stsd: bytes) -> tuple[Optional[str], Optional[int]]:
+    """
+    Codec e bitrate médio da primeira entrada de áudio de um 'stsd'.
+    Só reconhece AAC ('mp4a' com objectType 0x40/0x66-0x68); o resto vira (None, None).
+    """
+    entries = stsd[8:]  # versão/flags + entry_count
+    for kind, entry in _iter_atoms(entries):
+        if kind != b"mp4a" or len(entry) < 28:
+            return None, None
+        version = struct.unpack_from(">H", entry, 8)[0]
+        children = entry[28 + {1: 16, 2: 36}.get(version, 0):]
+        for sub_kind, esds in _iter_atoms(children):
+            if sub_kind != b"esds" or len(esds) < 6:
+                continue
+            try:
+                tag, pos, _ = _read_descriptor(esds, 4)
+                if tag != 0x03:
+                    return None, None
+                flags = esds[pos + 2]
+                pos += 3
+                if flags & 0x80:
+                    pos += 2
+                if flags & 0x40:
+                    pos += 1 + esds[pos]
+                if flags & 0x20:
+                    pos += 2
+                tag, pos, _ = _read_descriptor(esds, pos)
+                if tag != 0x04:
+                    return None, None
+                object_type = esds[pos]
+                max_rate, avg_rate = struct.unpack_from(">II", esds, pos + 5)
+            except (IndexError, struct.error):
+                return None, None
+            if object_type not in (0x40, 0x66, 0x67, 0x68):
+                return None, None
+            return "aac", (avg_rate or max_rate or None)
+        return None, None
+    return None, None
+
+
+def _mp4_track_fps(mdhd: bytes, stts: bytes) -> float:
+    """fps médio de uma trilha: amostras do 'stts' dividido pela duração na timescale do 'mdhd'."""
+    if len(mdhd) < 24 or len(stts) < 8:
+        return 0.0
+    timescale = struct.unpack_from(">I", mdhd, 20 if mdhd[0] == 1 else 12)[0]
+    count = struct.unpack_from(">I", stts, 4)[0]
+    if not timescale or len(stts) < 8 + count * 8:
+        return 0.0
+    samples = units = 0
+    for n, delta in struct.iter_unpack(">II", stts[8:8 + count * 8]):
+        samples += n
+        units += n * delta
+    return samples * timescale / units if units else 0.0
+
+
+def _mp4_quickprobe(path: Path) -> Optional[dict]:
+    """
+    Lê duração (mvhd) e dimensões (primeiro tkhd com tamanho) direto dos atoms de
+    MP4/MOV, sem abrir o ffprobe. Só o 'moov' é lido; 'mdat' é pulado com seek.
+    Retorna None para qualquer coisa fora do esperado (o chamador usa o ffprobe).
+    """
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        moov = None
+        pos = 0
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            hdr = f.read(16)
+            if len(hdr) < 8:
+                return None
+            size, kind = struct.unpack_from(">I4s", hdr)
+            header = 8
+            if size == 1:
+                if len(hdr) < 16:
+                    return None
+                size = struct.unpack_from(">Q", hdr, 8)[0]
+                header = 16
+            elif size == 0:
+                size = file_size - pos
+            if size < header:
+                return None
+            if pos == 0 and kind != b"ftyp":
+                return None
+            if kind == b"moov":
+                if size > _MP4_MAX_MOOV_BYTES:
+                    return None
+                f.seek(pos + header)
+                moov = f.read(size - header)
+                break
+            pos += size
+    if not moov:
+        return None
+
+    duration = 0.0
+    width = height = 0
+    fps = 0.0
+    audio_codec: Optional[str] = None
+    audio_bitrate: Optional[int] = None
+    audio_seen = False
+    for kind, payload in _iter_atoms(moov):
+        if kind == b"mvhd" and len(payload) >= 32:
+            if payload[0] == 1:
+                timescale, units = struct.unpack_from(">IQ", payload, 20)
+            else:
+                timescale, units = struct.unpack_from(">II", payload, 12)
+            if timescale:
+                duration = units / timescale
+        elif kind == b"trak":
+            mdia = b""
+            for sub_kind, sub in _iter_atoms(payload):
+                if sub_kind == b"tkhd" and not width:
+                    offset = 88 if sub and sub[0] == 1 else 76
+                    if len(sub) >= offset + 8:
+                        w, h = struct.unpack_from(">II", sub, offset)
+                        width, height = w >> 16, h >> 16
+                elif sub_kind == b"mdia":
+                    mdia = sub
+            if not mdia:
+                continue
+            boxes = dict(_iter_atoms(mdia))
+            handler = boxes.get(b"hdlr", b"")[8:12]
+            if handler not in (b"vide", b"soun"):
+                continue
+            stbl = dict(_iter_atoms(dict(_iter_atoms(boxes.get(b"minf", b""))).get(b"stbl", b"")))
+            if handler == b"vide":
+                # Primeira trilha de vídeo: fps pelo mdhd/stts
+                if not fps:
+                    fps = _mp4_track_fps(boxes.get(b"mdhd", b""), stbl.get(b"stts", b""))
+            elif not audio_seen:
+                # Primeira trilha de áudio: hdlr 'soun' -> minf/stbl/stsd
+                audio_seen = True
+                stsd = stbl.get(b"stsd")
+                if stsd:
+                    audio_codec, audio_bitrate = _mp4_audio_info(stsd)
+    if duration <= 0:
+        # ex.: MP4 fragmentado (duração fica nos 'moof'); deixa para o ffprobe
+        return None
+    return {
+        "duration": duration,
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "size": file_size,
+        "audio_codec": audio_codec,
+        "audio_bitrate": audio_bitrate,
     }
 
 
 def _probe_media(path: Path) -> dict:
+    try:
+        quick = _mp4_quickprobe(path)
+    except (OSError, struct.error):
+        quick = None
+    if quick:
+        return quick
+
     cmd = [
         str(FFPROBE_EXE),
         "-v",
         "error",
         "-show_entries",
-        "format=duration,size:stream=width,height",
+        "format=duration:stream=codec_name,codec_type,width,height,r_frame_rate,bit_rate",
         "-of",
-        "json",
+        "csv=p=0",
         str(path),
     ]
-    cp = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    cp = subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        check=False,
+        startupinfo=WIN_HIDDEN_STARTUPINFO,
+        creationflags=WIN_CREATE_NO_WINDOW,
+    )
     if cp.returncode != 0:
         raise RuntimeError(f"ffprobe falhou ({cp.returncode}): {cp.stderr.strip()}")
-    try:
-        data = json.loads(cp.stdout or "{}")
-    except json.JSONDecodeError as exc:
-        raise RuntimeError(f"Não foi possível ler informações do vídeo: {exc}") from exc
-
-    format_info = data.get("format") or {}
-    streams = data.get("streams") or []
-    video_stream = streams[0] if streams else {}
-    duration = float(format_info.get("duration") or 0.0)
-    width = int(video_stream.get("width") or 0)
-    height = int(video_stream.get("height") or 0)
-    size = int(float(format_info.get("size") or path.stat().st_size))
+
+    # Saída em CSV: uma linha por stream ("codec,video,largura,altura,fps,bitrate" ou
+    # "codec,audio,fps,bitrate") e uma com a duração (format), que tem um campo só.
+    duration = 0.0
+    width = height = 0
+    fps = 0.0
+    audio_codec: Optional[str] = None
+    audio_bitrate: Optional[int] = None
+    audio_seen = False
+    for line in (cp.stdout or "").splitlines():
+        fields = line.strip().rstrip(",").split(",")
+        try:
+            if len(fields) == 1 and fields[0]:
+                duration = float(fields[0])
+            elif len(fields) >= 4 and fields[1] == "video" and not width:
+                width, height = int(fields[2] or 0), int(fields[3] or 0)
+                if len(fields) >= 5:
+                    num, _, den = fields[4].partition("/")
+                    if num.isdecimal() and den.isdecimal() and int(den):
+                        fps = int(num) / int(den)
+            elif len(fields) >= 2 and fields[1] == "audio" and not audio_seen:
+                audio_seen = True
+                audio_codec = fields[0] or None
+                if len(fields) >= 3 and fields[-1].isdecimal():
+                    audio_bitrate = int(fields[-1])
+        except ValueError:
+            continue  # "N/A" e afins
+    size = path.stat().st_size
     if duration <= 0:
         raise RuntimeError("Vídeo sem duração válida para compressão.")
-    return {"duration": duration, "width": width, "height": height, "size": size}
+    return {
+        "duration": duration,
+        "width": width,
+        "height": height,
+        "fps": fps,
+        "size": size,
+        "audio_codec": audio_codec,
+        "audio_bitrate": audio_bitrate,
+    }
 
 
 def _unique_output_path(base_dir: Path, base_name: str, suffix: str = ".mp4") -> Path:
-    candidate = base_dir / f"{base_name}{suffix}"
-    if not candidate.exists():
-        return candidate
+    # Um único scandir em vez de um stat() por tentativa. Windows/macOS não diferenciam
+    # maiúsculas em nomes de arquivo (por padrão); no Linux a comparação é exata.
+    fold = str.lower if sys.platform in ("win32", "darwin") else str
+    try:
+        with os.scandir(base_dir) as it:
+            existing = {fold(entry.name) for entry in it}
+    except OSError:
+        existing = set()
+    name = f"{base_name}{suffix}"
+    if fold(name) not in existing:
+        return base_dir / name
     for idx in range(1, 200):
-        alt = base_dir / f"{base_name}-{idx}{suffix}"
-        if not alt.exists():
-            return alt
+        name = f"{base_name}-{idx}{suffix}"
+        if fold(name) not in existing:
+            return base_dir / name
     unique = f"{base_name}-{uuid.uuid4().hex[:6]}"
     return base_dir / f"{unique}{suffix}"
 
 
-def _run_ffmpeg_with_progress_sync(cmd: List[str], duration: float, token: Optional[CancelToken] = None, task_name: str = "compressor") -> None:
+def _upload_fd_path(src) -> Optional[Path]:
+    """
+    No Linux, devolve um caminho (/proc/<pid>/fd/N) para o arquivo temporário em que o
+    Starlette já guardou o upload, permitindo que ffprobe/ffmpeg o leiam sem uma
+    segunda cópia em disco. Retorna None quando não é possível (Windows/macOS).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        rollover = getattr(src, "rollover", None)
+        if rollover:
+            rollover()
+        path = Path(f"/proc/{os.getpid()}/fd/{src.fileno()}")
+    except (AttributeError, OSError, ValueError):
+        return None
+    return path if path.exists() else None
+
+
+UPLOAD_COPY_CHUNK = 1 << 24  # por chamada de sendfile (16 MB)
+
+
+def _save_upload_sync(src, dest_path: Path, token: Optional[CancelToken] = None) -> int:
+    """
+    Copia o upload (SpooledTemporaryFile do Starlette) para dest_path.
+    No Linux usa os.sendfile entre os dois descritores (o kernel move as páginas sem
+    passar pelo Python); nos demais sistemas, cópia em blocos de 1 MB.
+    Checa o cancelamento entre os blocos. Retorna o total de bytes copiados.
+    """
+    with dest_path.open("wb") as dest:
+        if sys.platform.startswith("linux") and hasattr(os, "sendfile"):
+            try:
+                rollover = getattr(src, "rollover", None)
+                if rollover:
+                    rollover()  # garante um arquivo real em disco (no-op se já estiver)
+                in_fd = src.fileno()
+            except (AttributeError, OSError, ValueError):
+                in_fd = None
+            if in_fd is not None:
+                offset = src.tell()
+                total = 0
+                while True:
+                    if token and token.is_cancelled():
+                        raise CanceledByUser()
+                    sent = os.sendfile(dest.fileno(), in_fd, offset, UPLOAD_COPY_CHUNK)
+                    if not sent:
+                        return total
+                    offset += sent
+                    total += sent
+
+        total = 0
+        while True:
+            if token and token.is_cancelled():
+                raise CanceledByUser()
+            chunk = src.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                return total
+            dest.write(chunk)
+            total += len(chunk)
+
+
+_FFMPEG_PROGRESS_PREFIX = b"out_time_ms="
+
+# Estimativa de bitrate por qualidade: trecho de 20 s codificado com CRF 23 (x264)
+QUALITY_SAMPLE_SECONDS = 20
+QUALITY_TARGET_CRF = 23
+
+# Encode em trechos paralelos (só libx264): vídeos a partir de 2 min, trechos de >= 1 min
+SEGMENT_MIN_DURATION = 120.0
+SEGMENT_MIN_LENGTH = 60.0
+SEGMENT_MAX_WORKERS = 4
+
+
+def _run_ffmpeg_with_progress_sync(
+    cmd: List[str],
+    duration: float,
+    token: Optional[CancelToken] = None,
+    task_name: str = "compressor",
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> list[bytes]:
+    # Retorna as últimas linhas do stderr (ex.: o resumo do x264).
+    # stdout traz só o '-progress pipe:1' (bytes, sem decode por linha); o stderr vai para
+    # outro pipe, drenado em thread, e só é decodificado se o ffmpeg falhar.
+    # O cancelamento é vigiado por uma thread própria: não depende do ffmpeg imprimir algo.
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        universal_newlines=True,
-        encoding="utf-8",
-        errors="ignore",
+        stderr=subprocess.PIPE,
+        startupinfo=WIN_HIDDEN_STARTUPINFO,
+        creationflags=WIN_CREATE_NO_WINDOW,
     )
-    last_lines: List[str] = []
-    cancel_requested = False
+    last_lines: deque[bytes] = deque(maxlen=30)
+    cancel_requested = threading.Event()
+    status_verb = "Comprimindo..." if task_name == "compressor" else "Convertendo..."
+    buf = bytearray()
+    last_pct = -1.0
+    last_emit = 0.0
+    pending: Optional[float] = None
 
     def _terminate():
         try:
@@ -1027,83 +1991,542 @@ def _run_ffmpeg_with_progress_sync(cmd: List[str], duration: float, token: Optio
             except Exception:
                 pass
 
-    try:
-        for raw_line in process.stdout:  # type: ignore[attr-defined]
-            line = (raw_line or "").strip()
-            if not line:
-                continue
-            if token and token.is_cancelled():
-                cancel_requested = True
+    def _drain_stderr():
+        for line in process.stderr:  # type: ignore[union-attr]
+            line = line.strip()
+            if line:
+                last_lines.append(line)
+
+    def _watch_cancel():
+        while process.poll() is None:
+            if token.wait(0.1):
+                cancel_requested.set()
                 _terminate()
+                return
+
+    stderr_thread = threading.Thread(target=_drain_stderr, daemon=True)
+    stderr_thread.start()
+    if token:
+        threading.Thread(target=_watch_cancel, daemon=True).start()
+
+    try:
+        while True:
+            chunk = process.stdout.read1(65536)  # type: ignore[union-attr]
+            if not chunk:
                 break
-            last_lines.append(line)
-            if len(last_lines) > 30:
-                last_lines.pop(0)
-            if line.startswith("out_time_ms="):
-                try:
-                    micro = int(line.split("=", 1)[1])
-                    seconds = micro / 1_000_000.0
-                    pct = max(0.0, min(100.0, (seconds / duration) * 100.0))
-                    status_verb = "Comprimindo..." if task_name == "compressor" else "Convertendo..."
-                    ws_manager.broadcast_threadsafe({
-                        "task": task_name,
-                        "status": status_verb,
-                        "progress": round(pct, 2),
-                    })
-                except Exception:
-                    continue
+            buf += chunk
+            micro = None
+            ended = False
+            start = 0
+            while True:
+                nl = buf.find(b"\n", start)
+                if nl < 0:
+                    break
+                line = bytes(buf[start:nl]).strip()
+                start = nl + 1
+                if line.startswith(_FFMPEG_PROGRESS_PREFIX):
+                    try:
+                        micro = int(line[len(_FFMPEG_PROGRESS_PREFIX):])
+                    except ValueError:
+                        pass
+                elif line == b"progress=end":
+                    ended = True
+            del buf[:start]
+            if cancel_requested.is_set():
+                continue
+            # Só o valor mais recente do bloco lido interessa
+            if micro is not None and duration > 0:
+                seconds = micro / 1_000_000.0
+                pct = round(max(0.0, min(100.0, (seconds / duration) * 100.0)), 2)
+                if pct != last_pct:
+                    pending = pct
+            if pending is None:
+                continue
+            now = time.monotonic()
+            # Segura rajadas (< FLUSH_INTERVAL) antes de montar o payload, mas o último
+            # valor (100% ou 'progress=end') sempre sai
+            if not ended and pending < 100.0 and now - last_emit < WSManager.FLUSH_INTERVAL:
+                continue
+            last_pct, last_emit, pending = pending, now, None
+            if progress_cb:
+                progress_cb(last_pct)
+            else:
+                ws_manager.broadcast_threadsafe({
+                    "task": task_name,
+                    "status": status_verb,
+                    "progress": last_pct,
+                })
     finally:
-        stdout_remaining, _ = process.communicate()
-        if stdout_remaining:
-            for tail in (stdout_remaining.splitlines()[-10:]):
-                if tail:
-                    last_lines.append(tail.strip())
-                    if len(last_lines) > 30:
-                        last_lines.pop(0)
-    if cancel_requested:
+        process.wait()
+        stderr_thread.join(timeout=2)
+    if cancel_requested.is_set():
         raise CanceledByUser()
     if process.returncode not in (0, None):
-        snippet = "\n".join(last_lines[-6:])
+        snippet = "\n".join(line.decode("utf-8", errors="ignore") for line in list(last_lines)[-6:])
         raise RuntimeError(f"ffmpeg falhou ({process.returncode}). Detalhes:\n{snippet}")
+    return list(last_lines)
 
 
-async def _run_ffmpeg_with_progress(cmd: List[str], duration: float, token: Optional[CancelToken] = None, task_name: str = "compressor") -> None:
+async def _run_ffmpeg_with_progress(
+    cmd: List[str],
+    duration: float,
+    token: Optional[CancelToken] = None,
+    task_name: str = "compressor",
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> None:
     """
     Executa o ffmpeg em uma thread separada para não bloquear o event loop enquanto envia progresso.
+    Com 'progress_cb', o percentual vai para o callback em vez do WS.
+    """
+    await asyncio.to_thread(_run_ffmpeg_with_progress_sync, cmd, duration, token, task_name, progress_cb)
+
+
+_X264_KBPS_RE = re.compile(rb"kb/s:\s*([\d.]+)")
+
+
+def _estimate_crf_bitrate(
+    source: Path,
+    duration: float,
+    target_height: Optional[int],
+    token: Optional[CancelToken] = None,
+) -> Optional[int]:
+    """
+    Codifica um trecho do meio do vídeo em CRF (qualidade constante) e retorna o bitrate
+    de vídeo (bps) que o x264 precisou para essa qualidade; None se não der para medir.
+    Serve de teto: cenas simples não precisam de todo o orçamento do tamanho alvo.
+    Roda pelo mesmo caminho do ffmpeg principal: manda progresso e respeita o /cancel.
     """
-    await asyncio.to_thread(_run_ffmpeg_with_progress_sync, cmd, duration, token, task_name)
+    if duration < QUALITY_SAMPLE_SECONDS * 2:
+        return None
+    cmd = [
+        str(FFMPEG_EXE),
+        "-hide_banner",
+        "-nostats",
+        "-ss",
+        f"{(duration - QUALITY_SAMPLE_SECONDS) / 2:.3f}",
+        "-i",
+        str(source),
+        "-t",
+        str(QUALITY_SAMPLE_SECONDS),
+        "-an",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        str(QUALITY_TARGET_CRF),
+    ]
+    if target_height:
+        cmd.extend(["-vf", f"scale=-2:{target_height}"])
+    cmd.extend(["-progress", "pipe:1", "-f", "null", "-"])
+    try:
+        tail = _run_ffmpeg_with_progress_sync(
+            cmd,
+            QUALITY_SAMPLE_SECONDS,
+            token,
+            progress_cb=lambda pct: ws_manager.broadcast_threadsafe({
+                "task": "compressor",
+                "status": "Analisando qualidade (amostra)...",
+                "progress": pct,
+            }),
+        )
+    except RuntimeError:
+        return None
+    m = _X264_KBPS_RE.search(b"\n".join(tail))
+    if not m:
+        return None
+    try:
+        return int(float(m.group(1)) * 1000)
+    except ValueError:
+        return None
+
+
+def _plan_segments(duration: float) -> list[tuple[float, float]]:
+    """
+    Divide vídeos longos em trechos (início, duração) para encode paralelo por CPU.
+    Retorna [] quando não compensa (vídeo curto ou poucos núcleos).
+    """
+    if duration < SEGMENT_MIN_DURATION:
+        return []
+    workers = min(SEGMENT_MAX_WORKERS, (os.cpu_count() or 1) // 2, int(duration // SEGMENT_MIN_LENGTH))
+    if workers < 2:
+        return []
+    length = duration / workers
+    return [(i * length, length) for i in range(workers)]
+
+
+async def _compress_in_segments(
+    source: Path,
+    output_path: Path,
+    work_dir: Path,
+    segments: list[tuple[float, float]],
+    video_args: List[str],
+    audio_args: List[str],
+    token: CancelToken,
+) -> None:
+    """
+    Codifica cada trecho (só vídeo) num ffmpeg próprio, em paralelo, e junta tudo com o
+    concat demuxer (-c copy), levando o áudio do arquivo original nesse último passo.
+    Cada trecho usa uma fatia dos núcleos para não disputar com os outros.
+    """
+    threads = str(max(1, (os.cpu_count() or 1) // len(segments)))
+    progress = [0.0] * len(segments)
+    lock = threading.Lock()
+
+    def _report(idx: int, pct: float) -> None:
+        with lock:
+            progress[idx] = pct
+            overall = sum(progress) / len(progress)
+        # O concat final fica com os últimos 5%
+        ws_manager.broadcast_threadsafe({
+            "task": "compressor",
+            "status": f"Comprimindo ({len(segments)} partes em paralelo)...",
+            "progress": round(overall * 0.95, 2),
+        })
+
+    async def _run_segment(idx: int, start: float, length: float) -> Path:
+        seg_path = work_dir / f"seg_{idx:03d}.mp4"
+        cmd = [
+            str(FFMPEG_EXE),
+            "-hide_banner",
+            "-y",
+            "-ss",
+            f"{start:.3f}",
+            "-i",
+            str(source),
+            "-t",
+            f"{length:.3f}",
+            "-map",
+            "0:v:0",
+            "-an",
+            *video_args,
+            "-threads",
+            threads,
+            "-progress",
+            "pipe:1",
+            "-nostats",
+            str(seg_path),
+        ]
+        try:
+            await _run_ffmpeg_with_progress(cmd, length, token, progress_cb=functools.partial(_report, idx))
+        except RuntimeError:
+            token.cancel()  # derruba os outros trechos: o resultado já não serve
+            raise
+        return seg_path
+
+    results = await asyncio.gather(
+        *(_run_segment(i, start, length) for i, (start, length) in enumerate(segments)),
+        return_exceptions=True,
+    )
+    for res in results:
+        if isinstance(res, RuntimeError):
+            raise res
+    for res in results:
+        if isinstance(res, BaseException):
+            raise res
+
+    list_file = work_dir / "segments.txt"
+    list_file.write_text(
+        "".join("file '{}'\n".format(p.as_posix().replace("'", "'\\''")) for p in results),
+        encoding="utf-8",
+    )
+    total = sum(length for _, length in segments)
+    cmd = [
+        str(FFMPEG_EXE),
+        "-hide_banner",
+        "-y",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        str(list_file),
+        "-i",
+        str(source),
+        "-map",
+        "0:v:0",
+        "-map",
+        "1:a:0?",
+        "-c:v",
+        "copy",
+        *audio_args,
+        "-movflags",
+        "+faststart",
+        "-progress",
+        "pipe:1",
+        "-nostats",
+        str(output_path),
+    ]
+    await _run_ffmpeg_with_progress(
+        cmd,
+        total,
+        token,
+        progress_cb=lambda pct: ws_manager.broadcast_threadsafe({
+            "task": "compressor",
+            "status": "Juntando partes...",
+            "progress": round(95.0 + pct * 0.05, 2),
+        }),
+    )
 
 
+@functools.lru_cache(maxsize=1)
 def _ffmpeg_list_encoders() -> str:
     """
     Executa `ffmpeg -encoders` somente uma vez (cache) para descobrir os encoders de GPU.
+    A saída também fica em disco (FFMPEG_ENCODERS_CACHE_FILE), com o tamanho e o mtime
+    do binário na primeira linha; enquanto o ffmpeg não mudar, nem o processo é aberto.
     """
+    try:
+        st = FFMPEG_EXE.stat()
+        key = f"{st.st_size}-{st.st_mtime_ns}"
+    except OSError:
+        key = None
+    if key:
+        try:
+            header, _, body = FFMPEG_ENCODERS_CACHE_FILE.read_text(encoding="utf-8").partition("\n")
+            if header == key:
+                return body
+        except OSError:
+            pass
+
     cmd = [str(FFMPEG_EXE), "-hide_banner", "-encoders"]
     try:
-        cp = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        cp = subprocess.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            check=False,
+            startupinfo=WIN_HIDDEN_STARTUPINFO,
+            creationflags=WIN_CREATE_NO_WINDOW,
+        )
     except Exception:
         return ""
     if cp.returncode != 0:
         return ""
-    return cp.stdout or ""
+    output = cp.stdout or ""
+    if key and output:
+        try:
+            _ensure_dir(FFMPEG_ENCODERS_CACHE_FILE.parent)
+            tmp = FFMPEG_ENCODERS_CACHE_FILE.with_suffix(".tmp")
+            tmp.write_text(f"{key}\n{output}", encoding="utf-8")
+            os.replace(tmp, FFMPEG_ENCODERS_CACHE_FILE)
+        except OSError:
+            pass
+    return output
+
+
+# Classe "Display" dos drivers no registro do Windows (uma subchave por adaptador)
+_WIN_DISPLAY_CLASS_KEY = r"SYSTEM\CurrentControlSet\Control\Class\{4d36e968-e325-11ce-bfc1-08002be10318}"
+
+
+def _gpu_names() -> list[str]:
+    """
+    Lista os adaptadores de vídeo sem abrir processos: registro no Windows,
+    sysfs (vendor:device PCI) no Linux. Em outras plataformas retorna [].
+    """
+    names: list[str] = []
+    try:
+        if sys.platform == "win32":
+            import winreg
+
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, _WIN_DISPLAY_CLASS_KEY) as root:
+                idx = 0
+                while True:
+                    try:
+                        sub = winreg.EnumKey(root, idx)
+                    except OSError:
+                        break
+                    idx += 1
+                    try:
+                        with winreg.OpenKey(root, sub) as adapter:
+                            desc, _ = winreg.QueryValueEx(adapter, "DriverDesc")
+                            names.append(str(desc))
+                    except OSError:
+                        continue
+        elif sys.platform.startswith("linux"):
+            for dev in Path("/sys/bus/pci/devices").iterdir():
+                try:
+                    if not (dev / "class").read_text().strip().startswith("0x03"):
+                        continue
+                    vendor = (dev / "vendor").read_text().strip()
+                    device = (dev / "device").read_text().strip()
+                    names.append(f"{vendor}:{device}")
+                except OSError:
+                    continue
+    except Exception:
+        pass
+    return sorted(names)
+
+
+def _gpu_driver_versions() -> list[str]:
+    """
+    Versões dos drivers de vídeo (entram na chave do cache: atualizar o driver pode
+    habilitar um encoder). Windows: DriverVersion no registro; Linux: módulo nvidia
+    (fora da árvore) e a versão do kernel, que traz amdgpu/i915.
+    """
+    versions: list[str] = []
+    try:
+        if sys.platform == "win32":
+            import winreg
+
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, _WIN_DISPLAY_CLASS_KEY) as root:
+                idx = 0
+                while True:
+                    try:
+                        sub = winreg.EnumKey(root, idx)
+                    except OSError:
+                        break
+                    idx += 1
+                    try:
+                        with winreg.OpenKey(root, sub) as adapter:
+                            version, _ = winreg.QueryValueEx(adapter, "DriverVersion")
+                            versions.append(str(version))
+                    except OSError:
+                        continue
+        elif sys.platform.startswith("linux"):
+            versions.append(os.uname().release)
+            try:
+                versions.append("nvidia " + Path("/sys/module/nvidia/version").read_text().strip())
+            except OSError:
+                pass
+    except Exception:
+        pass
+    return sorted(versions)
+
+
+def _hw_encoder_candidates(gpus: list[str]) -> list[str]:
+    """
+    Filtra HW_ENCODER_ORDER pelos fabricantes de GPU presentes, evitando por exemplo
+    escolher QSV numa máquina só com NVIDIA. Sem lista de GPUs, mantém todos.
+    """
+    if sys.platform == "darwin":
+        return [enc for vendor, enc in HW_ENCODER_ORDER if vendor == "apple"]
+    if not gpus:
+        return [enc for _, enc in HW_ENCODER_ORDER if enc]
+    vendors = {
+        vendor
+        for vendor, pattern in GPU_VENDOR_PATTERNS.items()
+        if any(pattern.search(name) for name in gpus)
+    }
+    return [enc for vendor, enc in HW_ENCODER_ORDER if enc and vendor in vendors]
+
+
+def _hw_encoder_cache_key() -> Optional[dict]:
+    try:
+        st = FFMPEG_EXE.stat()
+    except OSError:
+        return None
+    return {
+        "probe": 3,  # muda quando o critério de detecção muda (invalida caches antigos)
+        "ffmpeg": str(FFMPEG_EXE),
+        "ffmpeg_mtime": st.st_mtime,
+        "ffmpeg_size": st.st_size,
+        "gpus": _gpu_names(),
+        "drivers": _gpu_driver_versions(),
+    }
+
+
+def _load_hw_encoder_cache(key: Optional[dict]) -> Optional[list[str]]:
+    if key is None:
+        return None
+    try:
+        data = json.loads(HW_ENCODER_CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("key") != key:
+        return None
+    encoders = data.get("encoders")
+    if not isinstance(encoders, list):
+        return None
+    return [str(e) for e in encoders]
+
+
+def _save_hw_encoder_cache(key: Optional[dict], encoders: list[str]) -> None:
+    if key is None:
+        return
+    try:
+        _ensure_dir(HW_ENCODER_CACHE_FILE.parent)
+        tmp = HW_ENCODER_CACHE_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"key": key, "encoders": encoders}), encoding="utf-8")
+        os.replace(tmp, HW_ENCODER_CACHE_FILE)
+    except OSError:
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def _probe_encoder(codec: str) -> Optional[bool]:
+    """
+    Codifica um único quadro preto para /dev/null com o encoder: estar listado em
+    `ffmpeg -encoders` não garante driver/GPU compatível (ex.: nvenc numa máquina AMD).
+    Retorna None quando o teste não é conclusivo (timeout, falha ao abrir o processo):
+    nesse caso o resultado não deve ir para o cache em disco.
+    """
+    cmd = [
+        str(FFMPEG_EXE),
+        "-hide_banner",
+        "-loglevel", "error",
+        "-f", "lavfi",
+        "-i", "color=black:s=256x256",
+        "-frames:v", "1",
+        "-an",
+        "-c:v", codec,
+        "-f", "null",
+        "-",
+    ]
+    try:
+        cp = subprocess.run(
+            cmd,
+            capture_output=True,
+            timeout=HW_ENCODER_PROBE_TIMEOUT,
+            check=False,
+            startupinfo=WIN_HIDDEN_STARTUPINFO,
+            creationflags=WIN_CREATE_NO_WINDOW,
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    return cp.returncode == 0 and not cp.stderr.strip()
+
+
+def _parse_encoder_names(output: str) -> set[str]:
+    """Nomes dos encoders listados por 'ffmpeg -encoders' (linhas ' V....D nome descrição')."""
+    names: set[str] = set()
+    for line in output.splitlines():
+        parts = line.split(None, 2)
+        if len(parts) >= 2 and parts[0][:1] in ("V", "A", "S"):
+            names.add(parts[1])
+    return names
 
 
 def _detect_hw_encoders() -> list[str]:
     """
     Retorna a lista de encoders H.264 acelerados detectados no ffmpeg atual.
+    O resultado é persistido em disco (chave: binário do ffmpeg + GPUs da máquina),
+    então só o primeiro boot após trocar ffmpeg/placa de vídeo paga a detecção.
     """
     global _HW_ENCODER_DETECTED
+    if _HW_ENCODER_DETECTED is not None:
+        return list(_HW_ENCODER_DETECTED)
+    key = _hw_encoder_cache_key()
+    cached = _load_hw_encoder_cache(key)
     with _HW_ENCODER_LOCK:
         if _HW_ENCODER_DETECTED is not None:
             return list(_HW_ENCODER_DETECTED)
+        if cached is not None:
+            _HW_ENCODER_DETECTED = cached
+            return list(cached)
         output = _ffmpeg_list_encoders()
-        found: list[str] = []
-        for _, enc in HW_ENCODER_ORDER:
-            if not enc:
-                continue
-            if re.search(rf"\b{re.escape(enc)}\b", output):
-                found.append(enc)
+        gpus = key["gpus"] if key else _gpu_names()
+        available = _parse_encoder_names(output)
+        probes = {
+            enc: _probe_encoder(enc)
+            for enc in _hw_encoder_candidates(gpus)
+            if enc in available
+        }
+        found = [enc for enc, ok in probes.items() if ok]
         _HW_ENCODER_DETECTED = found
+        # Teste inconclusivo (ex.: driver ainda subindo) não é gravado: o próximo boot refaz
+        if output and None not in probes.values():
+            _save_hw_encoder_cache(key, found)
         return list(found)
 
 
@@ -1144,7 +2567,7 @@ def _select_video_encoder(preferred_mode: str) -> tuple[str, list[str], str]:
 def inspect_instagram_endpoint(
     url: str = Query(..., description="URL pública de post do Instagram"),
 ):
-    if not _is_instagram_url(url):
+    if classify_host(url) != "instagram":
         raise HTTPException(status_code=400, detail="URL não pertence ao Instagram.")
     try:
         return _summarize_instagram(url)
@@ -1163,7 +2586,6 @@ class QueueBody(BaseModel):
 
 @app.post("/download")
 def download_endpoint(
-    background: BackgroundTasks,
     url: str = Query(..., description="URL única"),
     format: str = Query("mp4"),
     quality: int = Query(192),
@@ -1177,10 +2599,7 @@ def download_endpoint(
         raise HTTPException(status_code=400, detail="URL vazia.")
     tgt = Path(target_dir) if target_dir else (ROOT_DIR / "downloads")
 
-    is_instagram = _is_instagram_url(url)
-    is_facebook = _is_facebook_url(url)
-    is_twitter = _is_twitter_url(url)
-    simple_mode = is_instagram or is_facebook or is_twitter
+    simple_mode = bool(classify_host(url))
 
     opts = _build_yt_args(
         format,
@@ -1206,12 +2625,13 @@ def download_endpoint(
     global ACTIVE_TOKEN
     ACTIVE_TOKEN = CancelToken()
 
-    background.add_task(_download_one, url, opts, ACTIVE_TOKEN)
+    DOWNLOAD_TOKENS.add(ACTIVE_TOKEN)
+    DOWNLOAD_POOL.submit(_download_one, url, opts, ACTIVE_TOKEN)
     return {"accepted": True}
 
 
 @app.post("/queue")
-def queue_endpoint(background: BackgroundTasks, body: QueueBody):
+def queue_endpoint(body: QueueBody):
     if not body.urls:
         raise HTTPException(status_code=400, detail="Nenhuma URL recebida.")
     tgt = Path(body.target_dir)
@@ -1221,15 +2641,13 @@ def queue_endpoint(background: BackgroundTasks, body: QueueBody):
     global ACTIVE_TOKEN
     ACTIVE_TOKEN = CancelToken()
 
-    def _run_queue(urls: List[str], base_opts: dict, target_dir: Path, token: CancelToken):
-        for u in urls:
-            if token.is_cancelled():
-                ws_manager.broadcast_threadsafe({
-                    "status": "Fila cancelada pelo usuário",
-                    "progress": 0,
-                })
-                return
-            _download_one(u, base_opts, token)
+    def _queue_done(target_dir: Path, token: CancelToken):
+        if token.is_cancelled():
+            ws_manager.broadcast_threadsafe({
+                "status": "Fila cancelada pelo usuário",
+                "progress": 0,
+            })
+            return
 
         # ✅ sinal único quando TODOS terminarem
         ws_manager.broadcast_threadsafe({
@@ -1239,7 +2657,8 @@ def queue_endpoint(background: BackgroundTasks, body: QueueBody):
             "target_dir": str(target_dir.resolve()),
         })
 
-    background.add_task(_run_queue, list(body.urls), opts, tgt, ACTIVE_TOKEN)
+    token = ACTIVE_TOKEN
+    _download_many(list(body.urls), opts, token, on_done=lambda: _queue_done(tgt, token))
     return {"accepted": True, "count": len(body.urls)}
 
 
@@ -1274,21 +2693,19 @@ async def compress_endpoint(
     })
 
     try:
-        with temp_input.open("wb") as dest:
-            while True:
-                chunk = await file.read(4 * 1024 * 1024)
-                if not chunk:
-                    break
-                dest.write(chunk)
-        await file.close()
+        source_input = await asyncio.to_thread(_upload_fd_path, file.file)
+        if source_input is None:
+            await asyncio.to_thread(_save_upload_sync, file.file, temp_input, current_token)
+            await file.close()
+            source_input = temp_input
 
-        if not temp_input.exists() or temp_input.stat().st_size == 0:
+        if not source_input.exists() or source_input.stat().st_size == 0:
             raise HTTPException(status_code=400, detail="Arquivo enviado está vazio.")
 
         if current_token.is_cancelled():
             raise CanceledByUser()
 
-        media = _probe_media(temp_input)
+        media = await asyncio.to_thread(_probe_media, source_input)
         duration = media["duration"]
         source_size = media["size"]
         source_height = media["height"]
@@ -1309,6 +2726,21 @@ async def compress_endpoint(
 
         target_bitrate = max(int((target_bytes * 8) / duration), 128_000)
         audio_bitrate = min(128_000, max(64_000, target_bitrate // 5))
+
+        if not _bool_from(discord_mode) and video_encoder == "libx264":
+            # Se uma amostra em CRF mostra que o conteúdo precisa de menos bits que o
+            # orçamento do tamanho alvo, usa só o necessário (mesma qualidade, arquivo menor)
+            ws_manager.broadcast_threadsafe({
+                "task": "compressor",
+                "status": "Analisando qualidade (amostra)...",
+                "progress": 0.0,
+            })
+            needed = await asyncio.to_thread(
+                _estimate_crf_bitrate, source_input, duration, target_height, current_token
+            )
+            if needed and needed + audio_bitrate < target_bitrate:
+                target_bitrate = max(needed + audio_bitrate, 128_000)
+                target_bytes = int(target_bitrate * duration / 8)
         video_bitrate = target_bitrate - audio_bitrate
         if video_bitrate < 64_000:
             video_bitrate = max(48_000, target_bitrate // 2)
@@ -1316,11 +2748,31 @@ async def compress_endpoint(
         if video_bitrate <= 0:
             raise HTTPException(status_code=400, detail="Taxa de bits resultante é inválida.")
 
+        # Áudio já em AAC e dentro do orçamento: copia o stream (sem decode/encode) e
+        # devolve ao vídeo os bits que sobraram
+        source_audio_bitrate = media.get("audio_bitrate") or 0
+        copy_audio = (
+            media.get("audio_codec") == "aac"
+            and 0 < source_audio_bitrate <= audio_bitrate * 1.1
+        )
+        if copy_audio:
+            video_bitrate = max(video_bitrate, target_bitrate - source_audio_bitrate)
+            audio_bitrate = source_audio_bitrate
+
         video_bitrate_k = max(64, video_bitrate // 1000)
         audio_bitrate_k = max(48, audio_bitrate // 1000)
+        audio_args = ["-c:a", "copy"] if copy_audio else ["-c:a", "aac", "-b:a", f"{audio_bitrate_k}k"]
         maxrate_k = max(video_bitrate_k + 1, int(video_bitrate * 1.35) // 1000)
         bufsize_k = max(video_bitrate_k + 1, int(video_bitrate * 2) // 1000)
 
+        if _bool_from(discord_mode) and video_encoder in LOW_LATENCY_ENCODER_ARGS:
+            fps = media.get("fps") or LOW_LATENCY_DEFAULT_FPS
+            encoder_args = [
+                *LOW_LATENCY_ENCODER_ARGS[video_encoder],
+                "-g",
+                str(max(1, round(fps * 2))),  # GOP de ~2 s
+            ]
+
         output_dir = _ensure_dir(Path(target_dir).expanduser()) if target_dir else DEFAULT_COMPRESS_DIR
         base_name = _sanitize_filename(custom_name) if custom_name else None
         if not base_name:
@@ -1328,36 +2780,46 @@ async def compress_endpoint(
             base_name = f"{original_stem}-compressed"
         output_path = _unique_output_path(output_dir, base_name, ".mp4")
 
-        cmd: List[str] = [
-            str(FFMPEG_EXE),
-            "-hide_banner",
-            "-y",
-            "-i",
-            str(temp_input),
-            "-c:v",
-            video_encoder,
-        ]
-        if encoder_args:
-            cmd.extend(encoder_args)
-        cmd.extend([
-            "-b:v",
-            f"{video_bitrate_k}k",
-            "-maxrate",
-            f"{maxrate_k}k",
-            "-bufsize",
-            f"{bufsize_k}k",
-            "-pix_fmt",
-            "yuv420p",
-            "-movflags",
-            "+faststart",
-            "-c:a",
-            "aac",
-            "-b:a",
-            f"{audio_bitrate_k}k",
-        ])
-        if target_height:
-            cmd.extend(["-vf", f"scale=-2:{target_height}"])
-        cmd.extend(["-progress", "pipe:1", "-nostats", str(output_path)])
+        def _video_args(gpu_scale: Optional[str]) -> List[str]:
+            args: List[str] = ["-c:v", video_encoder, *encoder_args]
+            args.extend([
+                "-b:v",
+                f"{video_bitrate_k}k",
+                "-maxrate",
+                f"{maxrate_k}k",
+                "-bufsize",
+                f"{bufsize_k}k",
+            ])
+            if gpu_scale is None:
+                # Quadros em memória do sistema (decode por CPU ou hwaccel sem output_format)
+                args.extend(["-pix_fmt", "yuv420p"])
+            if target_height:
+                scale = gpu_scale or "scale=-2:{h}"
+                args.extend(["-vf", scale.format(h=target_height)])
+            return args
+
+        def _build_cmd(
+            hwaccel: Optional[tuple[list[str], Optional[str]]],
+            pass_args: Optional[List[str]] = None,
+        ) -> List[str]:
+            decode_args, gpu_scale = hwaccel or ([], None)
+            return [
+                str(FFMPEG_EXE),
+                "-hide_banner",
+                "-y",
+                *decode_args,
+                "-i",
+                str(source_input),
+                *_video_args(gpu_scale),
+                *(pass_args or []),
+                "-movflags",
+                "+faststart",
+                *audio_args,
+                "-progress",
+                "pipe:1",
+                "-nostats",
+                str(output_path),
+            ]
 
         encoder_label = f"{'GPU' if encoder_kind == 'gpu' else 'CPU'}: {video_encoder}"
         ws_manager.broadcast_threadsafe({
@@ -1366,7 +2828,69 @@ async def compress_endpoint(
             "progress": 0.0,
         })
 
-        await _run_ffmpeg_with_progress(cmd, duration, current_token)
+        # Discord (tamanho rígido) com x264: dois passes acertam o tamanho com mais precisão
+        two_pass = _bool_from(discord_mode) and video_encoder == "libx264"
+        segments = _plan_segments(duration) if encoder_kind == "cpu" and not two_pass else []
+        if two_pass:
+            passlog = ["-passlogfile", str(temp_dir / "x264pass")]
+
+            def _pass_progress(offset: float, label: str):
+                return lambda pct: ws_manager.broadcast_threadsafe({
+                    "task": "compressor",
+                    "status": label,
+                    "progress": round(offset + pct / 2, 2),
+                })
+
+            first_pass = [
+                str(FFMPEG_EXE),
+                "-hide_banner",
+                "-y",
+                "-i",
+                str(source_input),
+                *_video_args(None),
+                "-pass",
+                "1",
+                *passlog,
+                "-an",
+                "-f",
+                "null",
+                "-progress",
+                "pipe:1",
+                "-nostats",
+                os.devnull,
+            ]
+            await _run_ffmpeg_with_progress(
+                first_pass, duration, current_token,
+                progress_cb=_pass_progress(0.0, "Analisando (passo 1/2)..."),
+            )
+            await _run_ffmpeg_with_progress(
+                _build_cmd(None, ["-pass", "2", *passlog]), duration, current_token,
+                progress_cb=_pass_progress(50.0, "Comprimindo (passo 2/2)..."),
+            )
+        elif segments:
+            await _compress_in_segments(
+                source_input,
+                output_path,
+                temp_dir,
+                segments,
+                _video_args(None),
+                audio_args,
+                current_token,
+            )
+        else:
+            hwaccel = HW_DECODE_ARGS.get(video_encoder) if encoder_kind == "gpu" else None
+            try:
+                await _run_ffmpeg_with_progress(_build_cmd(hwaccel), duration, current_token)
+            except RuntimeError:
+                if hwaccel is None:
+                    raise
+                # Decode na GPU falhou (driver/dispositivo/formato): repete com decode por CPU
+                ws_manager.broadcast_threadsafe({
+                    "task": "compressor",
+                    "status": f"Decodificação por GPU indisponível, tentando novamente ({encoder_label})...",
+                    "progress": 0.0,
+                })
+                await _run_ffmpeg_with_progress(_build_cmd(None), duration, current_token)
 
         if not output_path.exists():
             raise RuntimeError("Arquivo comprimido não foi gerado.")
@@ -1422,6 +2946,7 @@ async def compress_endpoint(
         raise HTTPException(status_code=500, detail=str(e))
 
     finally:
+        await file.close()
         if temp_dir.exists():
             try:
                 shutil.rmtree(temp_dir, ignore_errors=True)
@@ -1471,12 +2996,7 @@ async def convert_endpoint(
 
     try:
         # Save uploaded file
-        with temp_input.open("wb") as dest:
-            while True:
-                chunk = await file.read(4 * 1024 * 1024)
-                if not chunk:
-                    break
-                dest.write(chunk)
+        await asyncio.to_thread(_save_upload_sync, file.file, temp_input, current_token)
         await file.close()
 
         if not temp_input.exists() or temp_input.stat().st_size == 0:
@@ -1504,8 +3024,7 @@ async def convert_endpoint(
         temp_image = None
         if background_image and background_image.filename:
             temp_image = temp_dir / f"bg_{background_image.filename}"
-            with temp_image.open("wb") as dest:
-                shutil.copyfileobj(background_image.file, dest)
+            await asyncio.to_thread(_save_upload_sync, background_image.file, temp_image, current_token)
             await background_image.close()
 
         # Check for Audio -> Video case
@@ -1528,7 +3047,7 @@ async def convert_endpoint(
         duration = 0.0
         if category in {"audio", "video"}:
             try:
-                media = _probe_media(temp_input)
+                media = await asyncio.to_thread(_probe_media, temp_input)
                 duration = media.get("duration", 0.0)
             except Exception:
                 duration = 0.0
@@ -1567,7 +3086,15 @@ async def convert_endpoint(
             else:
                 # Audio without duration (rare, but handled like image for safety?)
                 # Usually audio has duration. If not, use standard call
-                 subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                await asyncio.to_thread(
+                    subprocess.run,
+                    cmd,
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    startupinfo=WIN_HIDDEN_STARTUPINFO,
+                    creationflags=WIN_CREATE_NO_WINDOW,
+                )
 
         elif category == "video":
             # Video conversion with GPU Auto-Detect + CPU Retry
@@ -1631,16 +3158,12 @@ async def convert_endpoint(
                 "progress": 50.0,
             })
             
-            startupinfo = None
-            if sys.platform == "win32":
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
             process = await asyncio.create_subprocess_exec(
                 *cmd,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                startupinfo=startupinfo,
+                startupinfo=WIN_HIDDEN_STARTUPINFO,
+                creationflags=WIN_CREATE_NO_WINDOW,
             )
             stdout, stderr = await process.communicate()
             if process.returncode != 0:
@@ -1728,13 +3251,13 @@ def select_dir():
     Abre um seletor de pasta no Windows/macOS/Linux e retorna o caminho.
     """
     try:
-        # Tkinter local (app desktop)
-        import tkinter as tk
-        from tkinter import filedialog
-        root = tk.Tk()
-        root.withdraw()
-        path = filedialog.askdirectory()
-        root.destroy()
+        # Tkinter local (app desktop), na raiz oculta reaproveitada entre chamadas
+        def _ask(root):
+            from tkinter import filedialog
+
+            return filedialog.askdirectory(parent=root)
+
+        path = _tk_call(_ask)
         return {"dir": path or None}
     except Exception:
         # Fallback: usa downloads padrão
@@ -1742,6 +3265,52 @@ def select_dir():
         return {"dir": str(default)}
 
 
+@functools.lru_cache(maxsize=1)
+def _win32_shell_api():
+    """Carrega shell32/ole32 uma vez, com assinaturas para ponteiros de 64 bits."""
+    import ctypes
+    from ctypes import wintypes
+
+    shell32 = ctypes.WinDLL("shell32", use_last_error=True)
+    ole32 = ctypes.WinDLL("ole32", use_last_error=True)
+    shell32.ILCreateFromPathW.argtypes = [wintypes.LPCWSTR]
+    shell32.ILCreateFromPathW.restype = ctypes.c_void_p
+    shell32.ILFree.argtypes = [ctypes.c_void_p]
+    shell32.ILFree.restype = None
+    shell32.SHOpenFolderAndSelectItems.argtypes = [
+        ctypes.c_void_p,
+        wintypes.UINT,
+        ctypes.c_void_p,
+        wintypes.DWORD,
+    ]
+    shell32.SHOpenFolderAndSelectItems.restype = ctypes.c_long
+    ole32.CoInitializeEx.argtypes = [ctypes.c_void_p, wintypes.DWORD]
+    ole32.CoInitializeEx.restype = ctypes.c_long
+    ole32.CoUninitialize.argtypes = []
+    ole32.CoUninitialize.restype = None
+    return shell32, ole32
+
+
+def _win_reveal(path: Path) -> bool:
+    """
+    Seleciona o arquivo no Explorer já aberto do shell (SHOpenFolderAndSelectItems),
+    sem criar um processo explorer.exe. Retorna False se a chamada falhar.
+    """
+    shell32, ole32 = _win32_shell_api()
+    hr_init = ole32.CoInitializeEx(None, 0x2)  # COINIT_APARTMENTTHREADED
+    try:
+        pidl = shell32.ILCreateFromPathW(str(path))
+        if not pidl:
+            return False
+        try:
+            return shell32.SHOpenFolderAndSelectItems(pidl, 0, None, 0) == 0
+        finally:
+            shell32.ILFree(pidl)
+    finally:
+        if hr_init in (0, 1):  # S_OK / S_FALSE: esta chamada inicializou o COM
+            ole32.CoUninitialize()
+
+
 @app.post("/reveal")
 def reveal(payload: dict):
     """
@@ -1758,10 +3327,19 @@ def reveal(payload: dict):
 
     try:
         if sys.platform.startswith("win"):
+            # Chamadas diretas ao shell; explorer.exe novo só como último recurso
             if p.is_file():
-                subprocess.Popen(["explorer", "/select,", str(p)])
+                try:
+                    revealed = _win_reveal(p)
+                except Exception:
+                    revealed = False
+                if not revealed:
+                    subprocess.Popen(["explorer", "/select,", str(p)])
             else:
-                subprocess.Popen(["explorer", str(p)])
+                try:
+                    os.startfile(str(p))  # type: ignore[attr-defined]
+                except OSError:
+                    subprocess.Popen(["explorer", str(p)])
         elif sys.platform == "darwin":
             if p.is_file():
                 subprocess.Popen(["open", "-R", str(p)])
@@ -1798,16 +3376,21 @@ async def ws_endpoint(ws: WebSocket):
     try:
         await ws_manager.connect(ws)
         # Mensagem inicial
-        await ws.send_json({"status": "Conectado", "progress": 0})
+        await ws.send_text(_dumps_text({"status": "Conectado", "progress": 0}))
         if LATEST_UPDATE:
-            await ws.send_json(LATEST_UPDATE)
+            await ws.send_text(_dumps_text(LATEST_UPDATE))
 
         while True:
-            # Mantém a conexão viva lendo pings do cliente, se houver
-            _ = await ws.receive_text()
+            # Mantém a conexão viva lendo pings do cliente, se houver; a mensagem crua
+            # basta (o conteúdo é descartado, então não há decode para str)
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
     except WebSocketDisconnect:
-        ws_manager.disconnect(ws)
+        pass
     except Exception:
+        pass
+    finally:
         ws_manager.disconnect(ws)
 
 
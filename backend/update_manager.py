@@ -1,13 +1,16 @@
 # update_manager.py
 from __future__ import annotations
 
+import functools
 import json
 import os
+import re
+import threading
 import time
 import typing as t
-from dataclasses import dataclass
-from urllib.request import Request, urlopen
-from urllib.error import URLError, HTTPError
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
 
 
 @dataclass
@@ -25,6 +28,11 @@ class ReleaseInfo:
         # Usa tag como "versão" preferencialmente
         return self.tag or self.name or ""
 
+    @functools.cached_property
+    def version_tuple(self) -> t.Tuple[int, ...]:
+        # Fixo por release: normaliza uma vez só
+        return _normalize_version(self.version)
+
     def as_public_dict(self) -> dict:
         return {
             "version": self.version,
@@ -43,6 +51,10 @@ class ReleaseInfo:
         }
 
 
+# Prefixo numérico da versão (ex: 'v2.1.0-beta' -> '2.1.0'); para em qualquer sufixo
+_VER_RE = re.compile(r"[vV]?([\d.]*)")
+
+
 def _normalize_version(v: str) -> t.Tuple[int, ...]:
     """
     Normaliza strings de versão como 'v2.1.0' -> (2,1,0).
@@ -50,28 +62,12 @@ def _normalize_version(v: str) -> t.Tuple[int, ...]:
     """
     if not isinstance(v, str):
         return (0,)
-    v = v.strip()
-    if v.lower().startswith("v"):
-        v = v[1:]
-    # Mantém apenas dígitos e pontos
-    clean = []
-    for ch in v:
-        if ch.isdigit() or ch == ".":
-            clean.append(ch)
-        else:
-            break  # para em qualquer sufixo (ex: -beta)
-    v = "".join(clean).strip(".")
-    if not v:
+    digits = _VER_RE.match(v.strip()).group(1).strip(".")
+    if not digits:
         return (0,)
-    parts = []
-    for part in v.split("."):
-        try:
-            parts.append(int(part))
-        except ValueError:
-            parts.append(0)
+    parts = [int(part) if part else 0 for part in digits.split(".")]
     # Normaliza comprimento para comparação mais estável (ex: 2 vs 2.0.0)
-    while len(parts) < 3:
-        parts.append(0)
+    parts += [0] * (3 - len(parts))
     return tuple(parts)
 
 
@@ -91,11 +87,14 @@ def _cmp_versions(a: str, b: str) -> int:
 class UpdateManager:
     """
     Verifica releases do GitHub para encontrar novas versões.
-    - Usa apenas urllib (sem dependências externas)
+    - Usa apenas a biblioteca padrão (http.client, com conexão keep-alive reaproveitada)
     - Aceita token via variável de ambiente GITHUB_TOKEN para evitar rate limit
     - Pode incluir pré-releases se desejado
+    - Opcionalmente persiste a última release em disco (cache_dir) e revalida com ETag
     """
 
+    RELEASES_PAGE_SIZE = 5
+
     def __init__(
         self,
         repo: str = "lucasjordaoreal/YouTube-Downloader-Tool---yt_dlp-GUI",
@@ -104,6 +103,8 @@ class UpdateManager:
         timeout: float = 7.0,
         cache_ttl_sec: int = 1800,
         token_env: str = "GITHUB_TOKEN",
+        cache_dir: t.Optional[t.Union[str, Path]] = None,
+        disk_cache_ttl_sec: int = 6 * 3600,
     ) -> None:
         """
         :param repo: "owner/repo"
@@ -112,14 +113,27 @@ class UpdateManager:
         :param timeout: timeout de rede (segundos)
         :param cache_ttl_sec: TTL para cache em memória (segundos)
         :param token_env: nome da variável de ambiente com o token do GitHub
+        :param cache_dir: pasta para o cache em disco (None desativa)
+        :param disk_cache_ttl_sec: idade máxima do cache em disco antes de revalidar (segundos)
         """
         self.repo = repo
         self.current_version = current_version
+        self._current_tuple = _normalize_version(current_version or "0.0.0")
         self.include_prereleases = include_prereleases
         self.timeout = timeout
         self.token = os.environ.get(token_env) or None
         self._cache: t.Tuple[float, t.Optional[ReleaseInfo]] = (0.0, None)
         self._cache_ttl = cache_ttl_sec
+        self._disk_cache_ttl = disk_cache_ttl_sec
+        self._disk_cache_file: t.Optional[Path] = None
+        self._rate_limited_until = 0.0
+        # Conexão HTTPS reaproveitada entre chamadas (evita novo handshake TCP+TLS)
+        self._conn: t.Any = None
+        self._conn_host = ""
+        self._conn_lock = threading.Lock()
+        if cache_dir:
+            safe_repo = repo.replace("/", "_")
+            self._disk_cache_file = Path(cache_dir) / f"latest_{safe_repo}.json"
 
     # --------------------- HTTP helpers ---------------------
 
@@ -135,36 +149,204 @@ class UpdateManager:
             h["Authorization"] = f"Bearer {self.token}"
         return h
 
-    def _get_json(self, url: str) -> t.Optional[t.Any]:
-        req = Request(url, headers=self._headers(), method="GET")
+    def _close_conn(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+
+    def _send(self, host: str, path: str, headers: dict) -> t.Tuple[int, bytes, t.Any]:
+        """
+        GET na conexão persistente (keep-alive) com o host; reabre se o host mudou.
+        Uma conexão ociosa pode ter sido fechada pelo servidor: nesse caso tenta de novo
+        uma vez, já com conexão nova.
+        """
+        # Import tardio: http.client puxa email/ssl e só é usado aqui
+        import http.client
+
+        for attempt in (0, 1):
+            if self._conn is None or self._conn_host != host:
+                self._close_conn()
+                self._conn = http.client.HTTPSConnection(host, timeout=self.timeout)
+                self._conn_host = host
+            try:
+                self._conn.request("GET", path, headers=headers)
+                resp = self._conn.getresponse()
+                body = resp.read()
+            except (OSError, http.client.HTTPException):
+                self._close_conn()
+                if attempt:
+                    raise
+                continue
+            if resp.will_close:
+                self._close_conn()
+            return resp.status, body, resp.headers
+        raise OSError("unreachable")
+
+    def _request_json(
+        self, url: str, etag: t.Optional[str] = None
+    ) -> t.Tuple[int, t.Optional[t.Any], t.Optional[str]]:
+        """
+        GET com suporte a requisição condicional.
+        Retorna (status, json, etag); status 304 significa "não mudou" e 0, falha de rede.
+        """
+        headers = self._headers()
+        if etag:
+            headers["If-None-Match"] = etag
         try:
-            with urlopen(req, timeout=self.timeout) as resp:
-                data = resp.read().decode("utf-8", errors="replace")
-                return json.loads(data)
-        except HTTPError as e:
+            with self._conn_lock:
+                # Segue até 3 redirecionamentos (ex.: repositório renomeado)
+                for _ in range(4):
+                    parts = urlsplit(url)
+                    path = parts.path + (f"?{parts.query}" if parts.query else "")
+                    status, body, resp_headers = self._send(parts.netloc, path, headers)
+                    location = resp_headers.get("Location")
+                    if status in (301, 302, 307, 308) and location:
+                        url = urljoin(url, location)
+                        continue
+                    break
+        except Exception:
+            return 0, None, None
+
+        if status == 304:
+            return 304, None, etag
+        if status != 200:
             # 403 / rate limit / etc
-            # Você pode logar se quiser
+            self._note_rate_limit(status, resp_headers)
+            return status, None, None
+        try:
+            return status, json.loads(body.decode("utf-8", errors="replace")), resp_headers.get("ETag")
+        except ValueError:
+            return 0, None, None
+
+    def _note_rate_limit(self, status: int, headers: t.Any) -> None:
+        """
+        Guarda até quando o GitHub recusará novas chamadas (X-RateLimit-Reset / Retry-After),
+        para não insistir antes disso.
+        """
+        if status not in (403, 429) or headers is None:
+            return
+        until = 0.0
+        try:
+            if headers.get("X-RateLimit-Remaining") == "0":
+                until = float(headers.get("X-RateLimit-Reset") or 0)
+            elif headers.get("Retry-After"):
+                until = time.time() + float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return
+        if until > self._rate_limited_until:
+            self._rate_limited_until = until
+
+    def _get_json(self, url: str) -> t.Optional[t.Any]:
+        return self._request_json(url)[1]
+
+    # --------------------- Cache em disco ---------------------
+
+    def _load_disk_cache(self) -> t.Optional[dict]:
+        if not self._disk_cache_file:
             return None
-        except URLError:
+        try:
+            data = json.loads(self._disk_cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
             return None
-        except Exception:
+        if not isinstance(data, dict):
+            return None
+        if data.get("include_prereleases") != self.include_prereleases:
+            return None
+        return data
+
+    def _save_disk_cache(
+        self,
+        etag: t.Optional[str],
+        release: t.Optional[ReleaseInfo],
+        fetched: t.Optional[float] = None,
+    ) -> None:
+        if not self._disk_cache_file:
+            return
+        payload = {
+            "etag": etag,
+            "fetched": time.time() if fetched is None else fetched,
+            "rate_limited_until": self._rate_limited_until,
+            "include_prereleases": self.include_prereleases,
+            "release": asdict(release) if release else None,
+        }
+        try:
+            self._disk_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._disk_cache_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload), encoding="utf-8")
+            os.replace(tmp, self._disk_cache_file)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _release_from_cache(data: dict) -> t.Optional[ReleaseInfo]:
+        rel = data.get("release")
+        if not isinstance(rel, dict):
+            return None
+        try:
+            return ReleaseInfo(**rel)
+        except TypeError:
             return None
 
     # --------------------- GitHub release logic ---------------------
 
-    def _fetch_latest_release(self) -> t.Optional[ReleaseInfo]:
+    def _fetch_latest_release(self, allow_stale: bool = True) -> t.Optional[ReleaseInfo]:
         """
         Busca a release mais recente conforme configuração.
-        Se include_prereleases = False, escolhe a primeira não-draft e não-prerelease.
-        Caso contrário, pega a primeira não-draft (mesmo que prerelease).
+        Se include_prereleases = False, usa /releases/latest (só a release estável mais nova).
+        Caso contrário, lista as últimas releases e pega a primeira não-draft (mesmo que prerelease).
+
+        Com cache em disco: dentro de disk_cache_ttl_sec (e allow_stale) nem vai à rede;
+        depois disso revalida com If-None-Match, e um 304 reaproveita a release salva.
         """
-        # Para respeitar include_prereleases corretamente, usamos /releases (lista)
-        # e escolhemos a primeira adequada. (A rota /releases/latest ignora pré-releases)
-        url = self._api("/releases")
-        data = self._get_json(url)
+        disk = self._load_disk_cache()
+        if disk is not None:
+            try:
+                limited = float(disk.get("rate_limited_until") or 0)
+            except (TypeError, ValueError):
+                limited = 0.0
+            self._rate_limited_until = max(self._rate_limited_until, limited)
+            age = time.time() - float(disk.get("fetched") or 0)
+            if allow_stale and 0 <= age < self._disk_cache_ttl:
+                return self._release_from_cache(disk)
+
+        # Em rate limit: nem tenta a rede até o reset; usa o que houver salvo
+        if time.time() < self._rate_limited_until:
+            return self._release_from_cache(disk) if disk is not None else None
+
+        # /releases/latest devolve um único objeto (ignora drafts e pré-releases);
+        # com pré-releases é preciso a lista, limitada às mais recentes.
+        if self.include_prereleases:
+            url = self._api(f"/releases?per_page={self.RELEASES_PAGE_SIZE}")
+        else:
+            url = self._api("/releases/latest")
+        etag = disk.get("etag") if disk else None
+        status, data, new_etag = self._request_json(url, etag)
+        if status == 304 and disk is not None:
+            cached = self._release_from_cache(disk)
+            self._save_disk_cache(etag, cached)
+            return cached
+        if isinstance(data, dict):
+            data = [data]
         if not isinstance(data, list):
+            if time.time() < self._rate_limited_until:
+                # Grava o reset para que o próximo processo também espere
+                # (mantendo 'fetched': a release salva não foi revalidada)
+                self._save_disk_cache(
+                    etag,
+                    self._release_from_cache(disk) if disk is not None else None,
+                    fetched=float(disk.get("fetched") or 0) if disk is not None else 0.0,
+                )
             return None
 
+        latest = self._select_release(data)
+        self._save_disk_cache(new_etag, latest)
+        return latest
+
+    def _select_release(self, data: t.List[t.Any]) -> t.Optional[ReleaseInfo]:
+        """Escolhe a primeira release adequada da lista retornada pelo GitHub."""
         for rel in data:
             if not rel or rel.get("draft"):
                 continue
@@ -186,12 +368,13 @@ class UpdateManager:
         """
         Retorna ReleaseInfo da release mais recente adequada aos critérios.
         Usa cache em memória para evitar chamadas repetidas.
+        Com use_cache=False ignora o cache em memória e força revalidação do cache em disco.
         """
         now = time.time()
         ts, cached = self._cache
         if use_cache and cached and (now - ts) < self._cache_ttl:
             return cached
-        latest = self._fetch_latest_release()
+        latest = self._fetch_latest_release(allow_stale=use_cache)
         self._cache = (now, latest)
         return latest
 
@@ -207,12 +390,10 @@ class UpdateManager:
             return None
 
         # tag sobrescreve name como "versão"
-        current = self.current_version or "0.0.0"
-        latest_str = latest.version or latest.name or ""
-        if not latest_str:
+        if not latest.version:
             return None
 
-        if _cmp_versions(current, latest_str) < 0:
+        if self._current_tuple < latest.version_tuple:
             return latest.as_public_dict()
         return None
 
@@ -1,8 +1,28 @@
 import { defineConfig } from "vite";
 import react from "@vitejs/plugin-react";
+import { readFileSync, writeFileSync } from "node:fs";
+import { join } from "node:path";
+import { constants, gzipSync } from "node:zlib";
+
+// Gera arquivos .gz ao lado dos assets do build; o backend entrega a versão comprimida
+// direto do disco (Content-Encoding: gzip) em vez de comprimir a cada requisição.
+function precompress() {
+  return {
+    name: "ud-precompress",
+    apply: "build",
+    writeBundle(options, bundle) {
+      for (const fileName of Object.keys(bundle)) {
+        if (!/\.(js|css|html|svg|json)$/.test(fileName)) continue;
+        const file = join(options.dir, fileName);
+        const gz = gzipSync(readFileSync(file), { level: constants.Z_BEST_COMPRESSION });
+        writeFileSync(`${file}.gz`, gz);
+      }
+    },
+  };
+}
 
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), precompress()],
   server: {
     host: "127.0.0.1",
     port: 5174,       // Porta do Vite (ajuste combinando com o backend CORS)
@@ -1,21 +1,212 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from yt_dlp import YoutubeDL
+import importlib.util
 import threading
 import os
+import queue
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 
 # --- Aparência ---
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("dark-blue")  # base azul, com botão vermelho customizado
 
+# --- Encoders de vídeo ---
+# Encoders H.264 por hardware, em ordem de preferência
+HW_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_vaapi", "h264_videotoolbox")
+VAAPI_DEVICE = "/dev/dri/renderD128"
+VIDEO_BITRATE = "8M"
+
+# Argumentos de saída do FFmpegVideoConvertor para cada encoder
+ENCODER_ARGS = {
+    "h264_nvenc": ["-c:v", "h264_nvenc", "-preset", "p4", "-b:v", VIDEO_BITRATE],
+    "h264_qsv": ["-c:v", "h264_qsv", "-preset", "faster", "-b:v", VIDEO_BITRATE],
+    "h264_vaapi": ["-vf", "format=nv12,hwupload", "-c:v", "h264_vaapi", "-b:v", VIDEO_BITRATE],
+    "h264_videotoolbox": ["-c:v", "h264_videotoolbox", "-b:v", VIDEO_BITRATE],
+    # ultrafast já desliga CABAC, deblock, B-frames, mbtree e lookahead; -tune
+    # zerolatency só trocaria frame threads por sliced threads (menos vazão) e o
+    # -threads automático do x264 (1.5x núcleos) já supera -threads <núcleos>
+    "libx264": ["-c:v", "libx264", "-preset", "ultrafast"],
+}
+
+# --- Download ---
+# Fragmentos DASH/HLS baixados em paralelo (yt-dlp já mantém lives em sequência)
+FRAGMENT_THREADS_MAX = 16
+FRAGMENT_THREADS_DEFAULT = min(FRAGMENT_THREADS_MAX, max(4, os.cpu_count() or 4))
+ARIA2C_ARGS = ["-x16", "-s16", "-k1M", "--file-allocation=none"]
+ARIA2C = shutil.which("aria2c")
+PROGRESS_MIN_INTERVAL = 0.1  # ~10 atualizações/s da barra quando o % não muda
+
+# Pasta do app (ao lado do .exe quando empacotado) e FFmpeg local
+APP_DIR = os.path.dirname(sys.executable if getattr(sys, "frozen", False) else os.path.abspath(__file__))
+FFMPEG_BIN = os.path.join(APP_DIR, "ffmpeg", "bin")
+
+NO_WINDOW = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+
+
+def ffmpeg_exe(ffmpeg_dir):
+    # FFmpeg local (ffmpeg/bin) ou, na falta dele, o do PATH
+    local = os.path.join(ffmpeg_dir, "ffmpeg.exe" if sys.platform == "win32" else "ffmpeg")
+    return local if os.path.isfile(local) else (shutil.which("ffmpeg") or "ffmpeg")
+
+
+@lru_cache(maxsize=None)
+def pick_hw_encoder(ffmpeg_dir):
+    """Primeiro encoder de HW que o FFmpeg lista e que de fato abre; senão libx264."""
+    ffmpeg = ffmpeg_exe(ffmpeg_dir)
+    try:
+        listing = subprocess.run(
+            [ffmpeg, "-hide_banner", "-encoders"],
+            capture_output=True, text=True, timeout=10, creationflags=NO_WINDOW
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return "libx264"
+
+    available = {parts[1] for parts in map(str.split, listing.splitlines()) if len(parts) >= 2}
+    for enc in HW_ENCODERS:
+        if enc not in available:
+            continue
+        # listado não basta: sem a GPU/driver certo o encoder falha ao abrir
+        pre = ["-vaapi_device", VAAPI_DEVICE] if enc == "h264_vaapi" else []
+        test = [
+            ffmpeg, "-hide_banner", "-loglevel", "error", *pre,
+            "-f", "lavfi", "-i", "color=black:s=256x256:d=0.1",
+            *ENCODER_ARGS[enc], "-frames:v", "1", "-f", "null", "-",
+        ]
+        try:
+            if subprocess.run(test, capture_output=True, timeout=15, creationflags=NO_WINDOW).returncode == 0:
+                return enc
+        except (OSError, subprocess.SubprocessError):
+            pass
+    return "libx264"
+
+
+def convertor_args(encoder):
+    # postprocessor_args do FFmpegVideoConvertor ("_i" = antes do -i)
+    args = {"videoconvertor": ENCODER_ARGS[encoder] + ["-c:a", "aac"]}
+    if encoder == "h264_vaapi":
+        args["videoconvertor+ffmpeg_i"] = ["-vaapi_device", VAAPI_DEVICE]
+    return args
+
+
+# Opções fixas do yt-dlp (o resto é montado por download)
+BASE_OPTS = {
+    "merge_output_format": "mp4",
+    "noprogress": False,
+    "ffmpeg_location": FFMPEG_BIN,  # caminho para FFmpeg local
+    # rede: menos reconexões e retomada rápida quando o servidor estrangula
+    "socket_timeout": 10,
+    "http_chunk_size": 10 * 1024 * 1024,
+    "retries": 3,
+    "fragment_retries": 10,
+    "extractor_retries": 3,
+    "throttledratelimit": 100 * 1024,  # abaixo de 100 KB/s o yt-dlp reabre a conexão
+}
+if ARIA2C:
+    BASE_OPTS["external_downloader"] = {"default": "aria2c"}
+    BASE_OPTS["external_downloader_args"] = {"aria2c": ARIA2C_ARGS}
+
+
+# --- Formatos ---
+# Cada builder recebe (resolução, qualidade de áudio) e devolve
+# (format do yt-dlp, postprocessors, converter para MP4 H.264?)
+@lru_cache(maxsize=None)
+def _build_mp4_va(resolucao, qualidade_audio):
+    if resolucao == "Melhor disponível":
+        return "bestvideo[height<=?9999]+bestaudio/best", (), True
+    res_num = resolucao.split("p")[0]
+    return f"bestvideo[height<={res_num}]+bestaudio/best", (), True
+
+
+@lru_cache(maxsize=None)
+def _build_mp4_video(resolucao, qualidade_audio):
+    if resolucao == "Melhor disponível":
+        return "bestvideo[height<=?9999]/bestvideo", (), True
+    res_num = resolucao.split("p")[0]
+    return f"bestvideo[height<={res_num}]/bestvideo[height<={res_num}]", (), True
+
+
+def _audio_builder(codec):
+    @lru_cache(maxsize=None)
+    def build(resolucao, qualidade_audio):
+        pp = {"key": "FFmpegExtractAudio", "preferredcodec": codec, "preferredquality": qualidade_audio}
+        return "bestaudio[ext=m4a]/bestaudio", (pp,), False
+    return build
+
+
+FORMAT_BUILDERS = {
+    "MP4 (vídeo + áudio)": _build_mp4_va,
+    "MP4 (somente vídeo)": _build_mp4_video,
+    "MP4 (somente áudio)": _audio_builder("m4a"),
+    "MP3 (áudio extraído)": _audio_builder("mp3"),
+}
+
+
+def impersonate_target():
+    # Com curl_cffi instalado, o yt-dlp fala HTTP/2 com fingerprint de navegador
+    if importlib.util.find_spec("curl_cffi") is None:
+        return None
+    try:
+        from yt_dlp.networking.impersonate import ImpersonateTarget
+    except ImportError:
+        return None
+    return ImpersonateTarget("chrome")
+
+
+def max_height(resolucao):
+    return None if resolucao == "Melhor disponível" else int(resolucao.split("p")[0])
+
+
+def choose_format_id(info, height_cap, with_audio):
+    """
+    Escolhe, numa passada por info["formats"], o melhor vídeo H.264 (avc1) até
+    height_cap (+ o melhor áudio AAC). Só devolve a escolha se ela não perde
+    resolução para VP9/AV1; assim o remux por cópia substitui a recodificação.
+    """
+    best_v = best_a = None
+    top_height = 0
+    for f in info.get("formats") or ():
+        vcodec = f.get("vcodec") or "none"
+        acodec = f.get("acodec") or "none"
+        height = f.get("height") or 0
+        if vcodec != "none" and acodec == "none" and (not height_cap or height <= height_cap):
+            top_height = max(top_height, height)
+            if vcodec.startswith("avc1") and (
+                best_v is None or (height, f.get("tbr") or 0) > (best_v.get("height") or 0, best_v.get("tbr") or 0)
+            ):
+                best_v = f
+        elif vcodec == "none" and acodec.startswith("mp4a"):
+            if best_a is None or (f.get("abr") or f.get("tbr") or 0) > (best_a.get("abr") or best_a.get("tbr") or 0):
+                best_a = f
+
+    if best_v is None or (best_v.get("height") or 0) < top_height:
+        return None
+    if not with_audio:
+        return best_v["format_id"]
+    return f'{best_v["format_id"]}+{best_a["format_id"]}' if best_a else None
+
+
+@lru_cache(maxsize=4096)
+def eta_text(seconds):
+    # memo por segundo inteiro; o yt-dlp repete o mesmo ETA em muitos chunks
+    if seconds <= 0:
+        return "Calculando..."
+    m, s = divmod(seconds, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
 
 class DownloaderApp(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("YouTube Downloader Tool")
         self.iconbitmap("icon.ico")
-        self.geometry("700x480")
+        self.geometry("700x570")
         self.resizable(False, False)
 
         # Frame principal
@@ -65,6 +256,20 @@ class DownloaderApp(ctk.CTk):
 
         self.resolution_option.pack(pady=10)
 
+        # Conexões paralelas (fragmentos)
+        self.threads_var = ctk.IntVar(value=FRAGMENT_THREADS_DEFAULT)
+        self.threads_label = ctk.CTkLabel(self.main_frame, text=f"Conexões: {FRAGMENT_THREADS_DEFAULT}")
+        self.threads_label.pack()
+        self.threads_slider = ctk.CTkSlider(
+            self.main_frame,
+            from_=1,
+            to=FRAGMENT_THREADS_MAX,
+            number_of_steps=FRAGMENT_THREADS_MAX - 1,
+            variable=self.threads_var,
+            command=lambda v: self.threads_label.configure(text=f"Conexões: {int(v)}")
+        )
+        self.threads_slider.pack(pady=5)
+
         # Botão vermelho
         self.download_button = ctk.CTkButton(
             self.main_frame,
@@ -84,6 +289,39 @@ class DownloaderApp(ctk.CTk):
         self.status_label = ctk.CTkLabel(self.main_frame, text="")
         self.status_label.pack(pady=10)
 
+        # Resultado do pós-processamento: termina com o download seguinte já em
+        # andamento, então não pode escrever no status_label
+        self.pp_label = ctk.CTkLabel(self.main_frame, text="")
+        self.pp_label.pack()
+        self._downloading = False
+        self._pp_pending = 0
+
+        # Downloads aguardando na fila
+        self.queue_label = ctk.CTkLabel(self.main_frame, text="")
+        self.queue_label.pack()
+
+        # Throttle do progress_hook (chamado a cada chunk pelo yt-dlp)
+        self._last_hook_ts = 0.0
+        self._last_pct = -1
+
+        # YoutubeDL reaproveitado entre downloads (criado no primeiro uso,
+        # usado só pela thread de trabalho)
+        self._ydl = None
+
+        # Pós-processamento (ffmpeg) numa thread própria, com seu próprio
+        # YoutubeDL: enquanto um arquivo converte, o próximo já vai baixando
+        self._pp_ydl = None
+        self._pp_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pp")
+
+        # Fila de downloads atendida por uma única thread de trabalho
+        self._jobs = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+        # Detecta o encoder de HW em segundo plano (resultado fica em cache)
+        threading.Thread(
+            target=pick_hw_encoder, args=(FFMPEG_BIN,), daemon=True
+        ).start()
+
     # Alterna as opções conforme formato
     def on_format_change(self, value):
         for w in self.dynamic_frame.winfo_children():
@@ -94,7 +332,7 @@ class DownloaderApp(ctk.CTk):
         else:
             self.resolution_option.pack(pady=10)
 
-    # Inicia o download em thread separada
+    # Enfileira o download (as opções são lidas aqui, na thread do Tk)
     def start_download(self):
         url = self.url_entry.get().strip()
         if not url:
@@ -105,107 +343,181 @@ class DownloaderApp(ctk.CTk):
         if not folder:
             return
 
+        self._jobs.put((url, folder, self._snapshot_opts()))
+        self._update_queue_label()
+
+    def _snapshot_opts(self):
+        return {
+            "formato": self.format_option.get(),
+            "resolucao": self.resolution_option.get(),
+            "qualidade_audio": self.audio_quality_option.get().split()[0],
+            "threads": self.threads_var.get(),
+        }
+
+    def _update_queue_label(self):
+        pending = self._jobs.qsize()
+        self.queue_label.configure(text=f"Na fila: {pending}" if pending else "")
+
+    # Thread de trabalho: um download por vez, na ordem dos cliques
+    def _worker(self):
+        while True:
+            url, folder, opts = self._jobs.get()
+            self.after(0, self._on_job_start)
+            try:
+                self.download_video(url, folder, opts)
+            finally:
+                self._jobs.task_done()
+
+    def _on_job_start(self):
+        self._downloading = True
+        self._update_queue_label()
         self.status_label.configure(text="Baixando...")
         self.progress_bar.set(0)
         self.progress_bar.pack(pady=10)
-        threading.Thread(target=self.download_video, args=(url, folder), daemon=True).start()
 
-    # Atualiza progresso em tempo real
+    def _on_download_end(self):
+        self._downloading = False
+        self._pp_pending += 1
+        self.progress_bar.pack_forget()
+        self.status_label.configure(text="Processando...")
+
+    def _on_job_end(self, error=None):
+        self._pp_pending -= 1
+        if not self._downloading and not self._pp_pending:
+            self.status_label.configure(text="")
+        if error is None:
+            self.pp_label.configure(text="✅ Download concluído!")
+        else:
+            self.pp_label.configure(text="❌ Erro no download")
+            messagebox.showerror("Erro", error)
+
+    # Atualiza progresso em tempo real (roda na thread do download)
     def progress_hook(self, d):
         if d.get("status") == "downloading":
             total = d.get("total_bytes") or d.get("total_bytes_estimate")
             downloaded = d.get("downloaded_bytes", 0)
             percent = (downloaded / total) if total else 0
-            eta = d.get("eta", 0)
-
-            self.progress_bar.set(percent)
-            self.status_label.configure(
-                text=f"{percent*100:.1f}% • {self.format_eta(eta)} restantes"
-            )
+            pct = int(percent * 100)
+            now = time.monotonic()
+            if pct == self._last_pct and now - self._last_hook_ts < PROGRESS_MIN_INTERVAL:
+                return
+            self._last_pct, self._last_hook_ts = pct, now
+
+            text = f"{percent*100:.1f}% • {self.format_eta(d.get('eta'))} restantes"
+            self.after(0, self._apply_progress, percent, text)
         elif d.get("status") == "finished":
-            self.progress_bar.set(1)
-            self.status_label.configure(text="Quase lá...")
+            self._last_pct = -1
+            self.after(0, self._apply_progress, 1, "Quase lá...")
+
+    # Aplica o progresso nos widgets (thread do Tk)
+    def _apply_progress(self, percent, text):
+        self.progress_bar.set(percent)
+        self.status_label.configure(text=text)
 
     # Formata o tempo restante
     def format_eta(self, eta):
-        if not eta or eta <= 0:
-            return "Calculando..."
-        m, s = divmod(int(eta), 60)
-        h, m = divmod(m, 60)
-        return f"{h:02d}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
-
-    # Download principal
-    def download_video(self, url, folder):
-        formato = self.format_option.get()
-        resolucao = self.resolution_option.get()
-        qualidade_audio = self.audio_quality_option.get().split()[0]
-
-        ffmpeg_path = os.path.join(os.getcwd(), "ffmpeg", "bin")
-
+        return eta_text(int(eta) if eta else 0)
+
+    # Instância única: extratores e cookies são carregados uma vez só.
+    # O yt-dlp é importado aqui, no primeiro download, para a janela abrir antes.
+    def _get_ydl(self):
+        if self._ydl is None:
+            from ytdlp_ext import RangeYoutubeDL
+            params = {**BASE_OPTS, "progress_hooks": [self.progress_hook]}
+            impersonate = impersonate_target()
+            if impersonate:
+                try:
+                    self._ydl = RangeYoutubeDL({**params, "impersonate": impersonate})
+                except Exception:
+                    self._ydl = None  # alvo não suportado por esta versão
+            if self._ydl is None:
+                self._ydl = RangeYoutubeDL(params)
+        return self._ydl
+
+    # Instância separada para os PPs (usada só pela thread de pós-processamento)
+    def _get_pp_ydl(self):
+        if self._pp_ydl is None:
+            from yt_dlp import YoutubeDL
+            self._pp_ydl = YoutubeDL(dict(BASE_OPTS))
+        return self._pp_ydl
+
+    # Os 'postprocessors' das opções só são montados no __init__ do YoutubeDL,
+    # então a cada download eles são instanciados de novo
+    @staticmethod
+    def _build_postprocessors(ydl, postprocessors, convert_mp4):
+        from yt_dlp.postprocessor import FFmpegVideoConvertorPP, get_postprocessor
+        from ytdlp_ext import StreamCopyPP
+
+        pps = []
+        for pp_def in postprocessors:
+            pp_def = dict(pp_def)
+            pps.append(get_postprocessor(pp_def.pop("key"))(ydl, **pp_def))
+        if convert_mp4:
+            # remux por cópia roda antes; o conversor só recodifica o que sobrar
+            pps.append(StreamCopyPP(ydl))
+            pps.append(FFmpegVideoConvertorPP(ydl, preferedformat="mp4"))
+        return pps
+
+    # Roda na thread de pós-processamento, um arquivo por vez
+    def _postprocess(self, info, postprocessors, convert_mp4, pp_args):
+        ydl = self._get_pp_ydl()
+        ydl.params["postprocessor_args"] = pp_args
+        for pp in self._build_postprocessors(ydl, postprocessors, convert_mp4):
+            info = ydl.run_pp(pp, info)
+        return info
+
+    # Enfileirado depois dos PPs do job (pool FIFO de 1 thread): todos já terminaram
+    def _finish_job(self, futures, error):
+        for fut in futures:
+            if error is None and fut.exception() is not None:
+                error = str(fut.exception())
+        self.after(0, self._on_job_end, error)
+
+    # Download principal (roda na thread de trabalho)
+    def download_video(self, url, folder, opts):
+        fmt, postprocessors, convert_mp4 = FORMAT_BUILDERS[opts["formato"]](
+            opts["resolucao"], opts["qualidade_audio"]
+        )
         ydl_opts = {
-            "outtmpl": os.path.join(folder, "%(title)s.%(ext)s"),
-            "merge_output_format": "mp4",
-            "progress_hooks": [self.progress_hook],
-            "noprogress": False,
-            "postprocessors": [],
-            "ffmpeg_location": ffmpeg_path,  # caminho para FFmpeg local
+            "format": fmt,
+            "outtmpl": {"default": os.path.join(folder, "%(title)s.%(ext)s")},
+            "concurrent_fragment_downloads": opts["threads"],
         }
+        # converter automaticamente para MP4 H.264
+        pp_args = convertor_args(pick_hw_encoder(FFMPEG_BIN)) if convert_mp4 else {}
+
+        # Cada arquivo baixado (inclusive itens de playlist) vai para a fila de PP
+        futures = []
 
-        # MP4 (vídeo + áudio)
-        if formato == "MP4 (vídeo + áudio)":
-            if resolucao == "Melhor disponível":
-                ydl_opts["format"] = "bestvideo[height<=?9999]+bestaudio/best"
-            else:
-                res_num = resolucao.split("p")[0]
-                ydl_opts["format"] = f"bestvideo[height<={res_num}]+bestaudio/best"
-
-            # converter automaticamente para MP4 H.264
-            ydl_opts["postprocessors"].append({
-                "key": "FFmpegVideoConvertor",
-                "preferedformat": "mp4"
-            })
-
-        # MP4 (somente vídeo)
-        elif formato == "MP4 (somente vídeo)":
-            if resolucao == "Melhor disponível":
-                ydl_opts["format"] = "bestvideo[height<=?9999]/bestvideo"
-            else:
-                res_num = resolucao.split("p")[0]
-                ydl_opts["format"] = f"bestvideo[height<={res_num}]/bestvideo[height<={res_num}]"
-
-            ydl_opts["postprocessors"].append({
-                "key": "FFmpegVideoConvertor",
-                "preferedformat": "mp4"
-            })
-
-        # MP4 (somente áudio)
-        elif formato == "MP4 (somente áudio)":
-            ydl_opts["format"] = "bestaudio[ext=m4a]/bestaudio"
-            ydl_opts["postprocessors"].append({
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "m4a",
-                "preferredquality": qualidade_audio,
-            })
-
-        # MP3 (áudio extraído)
-        elif formato == "MP3 (áudio extraído)":
-            ydl_opts["format"] = "bestaudio[ext=m4a]/bestaudio"
-            ydl_opts["postprocessors"].append({
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": qualidade_audio,
-            })
+        def handoff(info):
+            futures.append(self._pp_pool.submit(self._postprocess, info, postprocessors, convert_mp4, pp_args))
 
         # Download
+        error = None
         try:
-            with YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            self.status_label.configure(text="✅ Download concluído!")
+            from ytdlp_ext import HandoffPP
+
+            ydl = self._get_ydl()
+            ydl.params.update(ydl_opts)
+            # o seletor é compilado só no __init__ do YoutubeDL; trocar
+            # params["format"] depois não tem efeito, então refaz a cada job
+            ydl.format_selector = ydl.build_format_selector(fmt)
+            for pps in ydl._pps.values():
+                pps.clear()
+            ydl.add_post_processor(HandoffPP(ydl, handoff), when="post_process")
+            # extrai uma vez, fixa o format_id (se houver H.264 equivalente) e baixa
+            info = ydl.extract_info(url, download=False)
+            if convert_mp4 and info.get("_type", "video") == "video":
+                format_id = choose_format_id(
+                    info, max_height(opts["resolucao"]), opts["formato"] == "MP4 (vídeo + áudio)"
+                )
+                if format_id:
+                    ydl.format_selector = ydl.build_format_selector(format_id)
+            ydl.process_ie_result(info, download=True)
         except Exception as e:
-            self.status_label.configure(text="❌ Erro no download")
-            messagebox.showerror("Erro", str(e))
-        finally:
-            self.progress_bar.pack_forget()
+            error = str(e)
+        self.after(0, self._on_download_end)
+        self._pp_pool.submit(self._finish_job, futures, error)
 
 
 if __name__ == "__main__":
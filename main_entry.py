@@ -1,5 +1,9 @@
 import argparse
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
 import sys
 import threading
 import time
@@ -16,47 +20,84 @@ _LOG_FILE_ENV = os.environ.get("ULTRA_LOG_FILE")
 LOG_FILE = Path(_LOG_FILE_ENV).expanduser() if _LOG_FILE_ENV else None
 
 
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 2
+
+
+def _setup_logger() -> logging.Logger:
+    """
+    Logger com QueueHandler: quem chama só enfileira; uma thread do QueueListener
+    escreve no console e no arquivo (aberto uma vez, com rotação).
+    """
+    handlers: list[logging.Handler] = []
+    if sys.stdout:  # None no build --noconsole
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console)
+    if LOG_FILE:
+        try:
+            LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+            )
+            file_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
+            handlers.append(file_handler)
+        except Exception:
+            pass
+
+    logger = logging.getLogger("ultra")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    atexit.register(listener.stop)  # drena a fila antes de sair
+    return logger
+
+
+logger = _setup_logger()
+
+
 def log(msg: str):
-    ts = time.strftime("[%H:%M:%S]")
-    line = f"{ts} {msg}"
-    print(msg)
-    if not LOG_FILE:
-        return
-    try:
-        LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        LOG_FILE.touch(exist_ok=True)
-        with LOG_FILE.open("a", encoding="utf-8") as f:
-            f.write(f"{line}\n")
-    except Exception:
-        pass
+    logger.info(msg)
 
 
-def ensure_binaries_on_path():
-    os.environ["PATH"] = str(BACKEND_DIR) + os.pathsep + os.environ.get("PATH", "")
-    for name in ["ffmpeg.exe", "ffprobe.exe", "yt-dlp.exe"]:
-        exe = BACKEND_DIR / name
-        if exe.exists():
-            os.environ[name.upper().replace(".", "_")] = str(exe)
-    os.chdir(BACKEND_DIR)
-    log(f"INFO PATH += {BACKEND_DIR}")
-    log(f"INFO CWD  = {Path.cwd()}")
+BINARY_NAMES = ("ffmpeg.exe", "ffprobe.exe", "yt-dlp.exe")
 
 
-import asyncio
-import uvicorn
+def ensure_binaries_on_path():
+    # Idempotente: relançar o app não acumula entradas repetidas no PATH
+    backend = str(BACKEND_DIR)
+    path = os.environ.get("PATH", "")
+    entries = {os.path.normcase(p) for p in path.split(os.pathsep) if p}
+    if os.path.normcase(backend) not in entries:
+        os.environ["PATH"] = backend + os.pathsep + path if path else backend
+        log(f"INFO PATH += {BACKEND_DIR}")
+
+    # Caminhos absolutos resolvidos uma vez; sem os.chdir (o backend não depende do CWD).
+    # Uma leitura do diretório em vez de um stat por binário.
+    try:
+        with os.scandir(BACKEND_DIR) as it:
+            present = {entry.name for entry in it if entry.is_file()}
+    except OSError:
+        present = set()
+    binaries = {name: str(BACKEND_DIR / name) for name in BINARY_NAMES if name in present}
+    for name, exe in binaries.items():
+        os.environ[name.upper().replace(".", "_")] = exe
+    return binaries
 
 
 def build_app_and_mount_static():
-    from backend.main import app as fastapi_app
+    from backend.main import app as fastapi_app, PrecompressedStaticFiles
     from fastapi import APIRouter, HTTPException
     from fastapi.responses import RedirectResponse, FileResponse
-    from starlette.staticfiles import StaticFiles
 
     if FRONTEND_DIST.exists():
-        fastapi_app.mount("/app", StaticFiles(directory=str(FRONTEND_DIST), html=True))
+        fastapi_app.mount("/app", PrecompressedStaticFiles(directory=str(FRONTEND_DIST), html=True))
         assets_dir = FRONTEND_DIST / "assets"
         if assets_dir.exists():
-            fastapi_app.mount("/assets", StaticFiles(directory=str(assets_dir)))
+            fastapi_app.mount("/assets", PrecompressedStaticFiles(directory=str(assets_dir)))
     else:
         log("⚠️ frontend/dist não encontrado. Rode 'npm run build'.")
 
@@ -89,9 +130,27 @@ class UvicornThread(threading.Thread):
         self.port = port
         self.log_level = log_level
         self.server = None
+        self.ready = threading.Event()
+
+    @staticmethod
+    def _new_loop():
+        import asyncio
+
+        # uvloop (vem com uvicorn[standard] fora do Windows) acelera o I/O de WebSocket
+        if sys.platform != "win32":
+            try:
+                import uvloop
+                return uvloop.new_event_loop()
+            except ImportError:
+                pass
+        return asyncio.new_event_loop()
 
     def run(self):
-        loop = asyncio.new_event_loop()
+        # importados aqui: o custo de carregar o uvicorn fica na thread do servidor
+        import asyncio
+        import uvicorn
+
+        loop = self._new_loop()
         asyncio.set_event_loop(loop)
 
         # 🔧 Limpa log_config para ambiente --noconsole
@@ -104,8 +163,16 @@ class UvicornThread(threading.Thread):
         log_config["handlers"].pop("access", None)
         log_config["formatters"].pop("access", None)
 
+        ready = self.ready
+
+        class _Server(uvicorn.Server):
+            async def startup(self, sockets=None):
+                await super().startup(sockets=sockets)
+                if not self.should_exit:
+                    ready.set()  # socket já está escutando
+
         try:
-            self.server = uvicorn.Server(
+            self.server = _Server(
                 uvicorn.Config(
                     self.app,
                     host=self.host,
@@ -126,21 +193,20 @@ class UvicornThread(threading.Thread):
             self.server.should_exit = True
 
 
-def wait_until_ready(url: str, timeout: float = 25.0):
-    import requests
+READY_POLL_INTERVAL = 0.05
 
-    session = requests.Session()
-    deadline = time.time() + timeout
 
-    while time.time() < deadline:
-        try:
-            resp = session.get(url, timeout=0.7)
-            if resp.ok:
-                log("Backend pronto!")
-                return True
-        except Exception:
-            pass
-        time.sleep(0.2)
+def wait_until_ready(server_thread: UvicornThread, timeout: float = 25.0):
+    # Só o sinal do próprio uvicorn conta: um connect TCP aceitaria qualquer outro
+    # processo que já estivesse escutando na porta
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if server_thread.ready.wait(READY_POLL_INTERVAL):
+            log("Backend pronto!")
+            return True
+        if not server_thread.is_alive():
+            break
 
     log("Backend n?o respondeu a tempo.")
     return False
@@ -173,7 +239,7 @@ def main():
     server_thread = UvicornThread(app, host=args.host, port=args.port)
     server_thread.start()
 
-    if not wait_until_ready(f"http://{args.host}:{args.port}/health", timeout=25.0):
+    if not wait_until_ready(server_thread, timeout=25.0):
         log("❌ Backend não iniciou. Abortando.")
         server_thread.stop()
         server_thread.join(timeout=3)
@@ -0,0 +1,263 @@
+"""
+Extensões do yt-dlp usadas pelo app (main.py): remux por cópia e download HTTP
+em faixas paralelas. Fica em módulo separado para o main.py só importar o
+yt-dlp (e todos os seus extratores) no primeiro download, não ao abrir a janela.
+"""
+import importlib
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from yt_dlp import YoutubeDL
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+from yt_dlp.postprocessor import FFmpegPostProcessor, PostProcessor
+
+
+# Download em faixas (Range) para URLs progressivas
+RANGE_PIECE_SIZE = 8 * 1024 * 1024
+RANGE_MIN_SIZE = 2 * RANGE_PIECE_SIZE
+RANGE_READ_SIZE = 1024 * 1024
+RANGE_START_WORKERS = 2
+RANGE_SAMPLE_SECONDS = 0.5
+RANGE_GROWTH = 1.1  # só abre outra conexão se a vazão subiu 10%+
+RANGE_RETRIES = 3
+# Parâmetro próprio (o yt-dlp ignora chaves desconhecidas) que liga o RangeFD
+RANGE_PARAM = "range_download"
+
+# Codecs que o MP4 aceita sem recodificar
+MP4_VCODECS = ("avc1", "h264")
+MP4_ACODECS = ("mp4a", "aac")
+# Extensões que já são MP4 (ISO BMFF) por dentro: basta trocar o nome
+MP4_SAME_CONTAINER = (".m4v",)
+
+
+class StreamCopyPP(FFmpegPostProcessor):
+    """Se o arquivo já é H.264/AAC, só remuxa (-c copy) para MP4 e dispensa o conversor."""
+
+    def run(self, info):
+        vcodec = (info.get("vcodec") or "").lower()
+        acodec = (info.get("acodec") or "none").lower()
+        if not vcodec.startswith(MP4_VCODECS) or not (acodec == "none" or acodec.startswith(MP4_ACODECS)):
+            return [], info  # VP9/AV1/Opus: segue para o FFmpegVideoConvertor
+
+        path = info["filepath"]
+        base, ext = os.path.splitext(path)
+        if ext.lower() == ".mp4":
+            return [], info  # já está no contêiner certo; o conversor também pula
+
+        out_path = base + ".mp4"
+        if ext.lower() in MP4_SAME_CONTAINER:
+            # mesmo contêiner: nem remux, só rename (ou cópia, se o original deve ficar)
+            if self.get_param("keepvideo"):
+                self.to_screen(f'Copiando "{path}" para MP4')
+                shutil.copyfile(path, out_path)  # sendfile/fcopyfile/buffer grande conforme o SO
+                deleted = [path]
+            else:
+                self.to_screen(f'Renomeando "{path}" para MP4')
+                os.replace(path, out_path)
+                deleted = []
+            info["filepath"] = out_path
+            info["ext"] = "mp4"
+            return deleted, info
+
+        self.to_screen(f'Remuxando "{path}" para MP4 sem recodificar')
+        self.run_ffmpeg(path, out_path, ["-map", "0", "-c", "copy"])  # já inclui +faststart
+        info["filepath"] = out_path
+        info["ext"] = "mp4"
+        return [path], info
+
+
+class HandoffPP(PostProcessor):
+    """
+    Único PP do download: entrega uma cópia do info para 'callback' (que roda os
+    PPs de verdade em outra thread) e libera o YoutubeDL para o próximo arquivo.
+    """
+
+    def __init__(self, downloader, callback):
+        super().__init__(downloader)
+        self._callback = callback
+
+    def run(self, info):
+        self._callback({**info, "__files_to_move": dict(info.get("__files_to_move") or {})})
+        return [], info
+
+
+def parallel_range_download(open_range, dest, size, n=8, on_progress=None):
+    """
+    Baixa 'size' bytes para 'dest' em pedaços de RANGE_PIECE_SIZE, cada um com
+    open_range(inicio, fim) (fim inclusivo, como no cabeçalho Range).
+    Começa com poucas conexões e abre outra (até n) enquanto a vazão total
+    medida a cada RANGE_SAMPLE_SECONDS continuar subindo.
+    """
+    with open(dest, "wb") as f:
+        f.truncate(size)
+
+    pieces = queue.SimpleQueue()
+    for start in range(0, size, RANGE_PIECE_SIZE):
+        pieces.put((start, min(start + RANGE_PIECE_SIZE, size) - 1))
+
+    done = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def fetch(out, start, end):
+        pos = start
+        for attempt in range(RANGE_RETRIES):
+            try:
+                resp = open_range(pos, end)
+                try:
+                    out.seek(pos)
+                    while pos <= end and not stop.is_set():
+                        chunk = resp.read(min(RANGE_READ_SIZE, end - pos + 1))
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                        pos += len(chunk)
+                        with lock:
+                            done[0] += len(chunk)
+                finally:
+                    resp.close()
+                if pos > end or stop.is_set():
+                    return
+            except Exception:
+                if attempt == RANGE_RETRIES - 1:
+                    raise
+        raise OSError(f"Faixa {start}-{end} incompleta ({pos - start} bytes)")
+
+    def worker():
+        with open(dest, "r+b") as out:
+            while not stop.is_set():
+                try:
+                    start, end = pieces.get_nowait()
+                except queue.Empty:
+                    return
+                fetch(out, start, end)
+
+    n = max(1, n)
+    with ThreadPoolExecutor(n, thread_name_prefix="range") as pool:
+        pending = {pool.submit(worker) for _ in range(min(RANGE_START_WORKERS, n))}
+        workers = len(pending)
+        last_done, last_speed, last_ts = 0, 0.0, time.monotonic()
+        try:
+            while pending:
+                finished, pending = wait(pending, RANGE_SAMPLE_SECONDS, FIRST_EXCEPTION)
+                for fut in finished:
+                    fut.result()
+                now = time.monotonic()
+                current = done[0]
+                speed = (current - last_done) / max(now - last_ts, 1e-6)
+                if on_progress:
+                    on_progress(current, speed)
+                # adaptativo: mais uma conexão enquanto a curva de vazão sobe
+                if workers < n and not pieces.empty() and speed > last_speed * RANGE_GROWTH:
+                    pending.add(pool.submit(worker))
+                    workers += 1
+                last_done, last_speed, last_ts = current, speed, now
+        except BaseException:
+            stop.set()
+            raise
+    return done[0]
+
+
+class RangeFD(HttpFD):
+    """HttpFD que usa parallel_range_download quando o servidor aceita Range."""
+
+    def _open_range(self, url, headers, start, end):
+        return self.ydl.urlopen(Request(url, headers={**headers, "Range": f"bytes={start}-{end}"}))
+
+    def _probe_size(self, url, headers):
+        # bytes=0-0 confirma suporte a Range e traz o tamanho em Content-Range
+        try:
+            resp = self._open_range(url, headers, 0, 0)
+        except Exception:
+            return None
+        try:
+            content_range = resp.headers.get("Content-Range") or ""
+            if resp.status != 206 or "/" not in content_range:
+                return None
+            total = content_range.rsplit("/", 1)[1]
+            return int(total) if total.isdigit() else None
+        finally:
+            resp.close()
+
+    def real_download(self, filename, info_dict):
+        tmpfilename = self.temp_name(filename)
+        if self.params.get("continuedl", True) and os.path.exists(tmpfilename):
+            # .part de uma tentativa anterior: o HttpFD sabe retomar de onde parou
+            return super().real_download(filename, info_dict)
+        url = info_dict["url"]
+        headers = dict(info_dict.get("http_headers") or {})
+        size = self._probe_size(url, headers)
+        if not size or size < RANGE_MIN_SIZE:
+            return super().real_download(filename, info_dict)
+
+        started = time.monotonic()
+        self.report_destination(filename)
+
+        def on_progress(downloaded, _speed):
+            elapsed = time.monotonic() - started
+            speed = downloaded / elapsed if elapsed else None
+            self._hook_progress({
+                "status": "downloading",
+                "downloaded_bytes": downloaded,
+                "total_bytes": size,
+                "filename": filename,
+                "tmpfilename": tmpfilename,
+                "elapsed": elapsed,
+                "speed": speed,
+                "eta": (size - downloaded) / speed if speed else None,
+            }, info_dict)
+
+        parallel_range_download(
+            lambda a, b: self._open_range(url, headers, a, b),
+            tmpfilename,
+            size,
+            n=self.params.get("concurrent_fragment_downloads") or 1,
+            on_progress=on_progress,
+        )
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "status": "finished",
+            "downloaded_bytes": size,
+            "total_bytes": size,
+            "filename": filename,
+            "elapsed": time.monotonic() - started,
+        }, info_dict)
+        return True
+
+
+def _range_suitable_downloader(info_dict, params={}, default=None, protocol=None, to_stdout=False):
+    """
+    get_suitable_downloader do yt-dlp, trocando HttpFD por RangeFD quando o YoutubeDL
+    pediu (RANGE_PARAM) e o arquivo é grande o bastante para valer as faixas.
+    O resto do YoutubeDL.dl (cópia do info, http_headers, progress hooks) fica intacto.
+    """
+    kwargs = {"protocol": protocol, "to_stdout": to_stdout}
+    if default is not None:
+        kwargs["default"] = default
+    fd = get_suitable_downloader(info_dict, params, **kwargs)
+    if fd is not HttpFD or to_stdout or not params.get(RANGE_PARAM):
+        return fd
+    size = info_dict.get("filesize") or info_dict.get("filesize_approx") or 0
+    use_range = (
+        not (params.get("test") or params.get("ratelimit") or info_dict.get("is_live"))
+        and (params.get("concurrent_fragment_downloads") or 1) > 1
+        and size >= RANGE_MIN_SIZE  # tamanho desconhecido/pequeno: nem gasta o probe
+    )
+    return RangeFD if use_range else fd
+
+
+# O YoutubeDL resolve get_suitable_downloader pelo nome global do seu módulo
+importlib.import_module("yt_dlp.YoutubeDL").get_suitable_downloader = _range_suitable_downloader
+
+
+class RangeYoutubeDL(YoutubeDL):
+    """YoutubeDL que usa o RangeFD em downloads HTTP progressivos grandes."""
+
+    def __init__(self, params=None, auto_init=True):
+        super().__init__({**(params or {}), RANGE_PARAM: True}, auto_init)